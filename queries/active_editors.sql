@@ -15,7 +15,7 @@ aggregated_edits AS (
     FROM wmf_product.editor_month e
     INNER JOIN global_user_registration g ON e.user_name = g.user_name
     WHERE
-        e.month = '{metrics_month_first_day}'
+        e.month BETWEEN '{range_first_day}' AND '{range_last_month_first_day}'
         AND e.user_id != 0
         AND NOT e.bot_by_group
         AND e.user_name NOT REGEXP 'bot\\b'
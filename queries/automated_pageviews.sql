@@ -3,8 +3,8 @@ SELECT
     SUM(view_count) AS automated_pageviews
 FROM wmf.pageview_hourly
 WHERE
-    year = {metrics_year}
-    AND month = {metrics_cur_month}
+    year BETWEEN {range_first_year} AND {range_last_year}
+    AND year * 100 + month BETWEEN {range_first_year_month} AND {range_last_year_month}
     AND agent_type = 'automated'
     AND NOT (
         country_code IN ('PK', 'IR', 'AF') -- https://phabricator.wikimedia.org/T157404#3194046
@@ -20,7 +20,7 @@ quality_articles_aggregated_genders AS (
     FROM content_gap_metrics.by_category c
     INNER JOIN wikipedia_dbs w ON c.wiki_db = w.database_code
     WHERE 
-        c.time_bucket = '{metrics_month}'
+        c.time_bucket BETWEEN '{range_first_month}' AND '{range_last_month}'
         AND c.content_gap IN ('gender', 'geography_wmf_region')
 )
 SELECT 
@@ -10,6 +10,7 @@ WHERE
     )
     AND event_entity = 'revision'
     AND event_type = 'create'
-    AND event_timestamp BETWEEN '{metrics_month_start}' AND '{metrics_month_end}'
+    AND event_timestamp >= '{range_start}'
+    AND event_timestamp < '{range_end}'
     AND snapshot = '{mediawiki_history_snapshot}'
 GROUP BY DATE_FORMAT(event_timestamp, 'yyyy-MM-01')
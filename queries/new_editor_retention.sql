@@ -1,6 +1,9 @@
+-- Retention is reported in the month after the cohort's second month, i.e. two months
+-- after the cohort month
 SELECT
-    '{metrics_month_first_day}' AS month,
+    CAST(ADD_MONTHS(TO_DATE(CONCAT(cohort, '-01')), 2) AS STRING) AS month,
     SUM(CAST(2nd_month_edits >= 1 AS INT))
         / SUM(CAST(1st_month_edits >= 1 AS INT)) AS new_editor_retention
 FROM wmf_product.new_editors
-WHERE cohort = '{retention_cohort}'
+WHERE cohort BETWEEN '{range_first_retention_cohort}' AND '{range_last_retention_cohort}'
+GROUP BY cohort
@@ -25,8 +25,8 @@ SELECT
     SUM(previews_seen) AS previews_seen
 FROM a
 WHERE
-    year = {metrics_year}
-    AND month = {metrics_cur_month}
+    year BETWEEN {range_first_year} AND {range_last_year}
+    AND year * 100 + month BETWEEN {range_first_year_month} AND {range_last_year_month}
 GROUP BY CONCAT(year, '-', month, '-01')
 ORDER BY month
 LIMIT 10000
@@ -5,6 +5,6 @@ SELECT
     SUM(total) AS total_pageview
 FROM wmf_product.pageviews_corrected
 WHERE
-    year = {metrics_year}
-    AND month = {metrics_cur_month}
+    year BETWEEN {range_first_year} AND {range_last_year}
+    AND year * 100 + month BETWEEN {range_first_year_month} AND {range_last_year_month}
 GROUP BY CONCAT(year, '-', month, '-01')
@@ -8,7 +8,7 @@ WITH country_ud AS (
     ON ud.country_code = cc.iso_code
     WHERE
         project_family = 'wikipedia'
-        AND day = '{metrics_month_first_day}'
+        AND day BETWEEN '{range_first_day}' AND '{range_last_month_first_day}'
 )
 SELECT
     month,
@@ -2,7 +2,8 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from src.utils import load_metric_file
-from src.utils import subtract_year
+from src.rollup import fiscal_rollup
+from src.reporting import reporting_table, report_for
 import wmfdata
 
 # Reshape the quality article data into standard metric table format
@@ -18,78 +19,106 @@ def pivot_quality_data(df):
     
     return pivoted
 
-# Calculate MoM and totals as well proportions
-def calculate_mom(df):
-    # Define column names using the categories
-    gender_categories = ['gender_diverse', 'males', 'females']
-    region_categories = [
-        'Central & Eastern Europe & Central Asia', 'East, Southeast Asia, & Pacific',
-        'Latin America & Caribbean', 'Middle East & North Africa',
-        'North America', 'Northern & Western Europe', 'South Asia',
-        'Sub-Saharan Africa'
-    ]
-    
-    # Create list of genders and regions using prefixes
-    all_genders = ['MoM_net_new_quality_articles_about_' + gender for gender in gender_categories]
-    all_regions = ['MoM_net_new_quality_articles_about_' + region for region in region_categories]
-    
-    underrepresented_gender = [name for name in all_genders if 'females' in name or 'gender_diverse' in name]
-    underrepresented_region = [name for name in all_regions if name.rsplit('_', 1)[-1] not in ['Central & Eastern Europe & Central Asia', 'North America', 'Northern & Western Europe']]
-
-    # Compute the MoM difference only for the last value
-    for column in df.columns:
-        if 'total' in column:
-
-            mom_column_name = column.replace('total_', 'MoM_net_new_')
-            df.at[df.index[-1], mom_column_name] = df[column].iloc[-1] - df[column].iloc[-2]
-    
-    # Calculate and update the last row for the sum columns
-    df.at[df.index[-1], 'gender_minorities_net_new_articles_sum'] = df.loc[df.index[-1], underrepresented_gender].sum()
-    df.at[df.index[-1], 'underrepresented_regions_net_new_articles_sum'] = df.loc[df.index[-1], underrepresented_region].sum()
-    df.at[df.index[-1], 'all_genders_net_new_articles_sum'] = df.loc[df.index[-1], all_genders].sum()
-    df.at[df.index[-1], 'all_regions_net_new_articles_sum'] = df.loc[df.index[-1], all_regions].sum()
+GENDER_CATEGORIES = ['gender_diverse', 'males', 'females']
+REGION_CATEGORIES = [
+    'Central & Eastern Europe & Central Asia', 'East, Southeast Asia, & Pacific',
+    'Latin America & Caribbean', 'Middle East & North Africa',
+    'North America', 'Northern & Western Europe', 'South Asia',
+    'Sub-Saharan Africa'
+]
+UNDERREPRESENTED_GENDERS = ['gender_diverse', 'females']
+UNDERREPRESENTED_REGIONS = [
+    region for region in REGION_CATEGORIES
+    if region not in ['Central & Eastern Europe & Central Asia', 'North America', 'Northern & Western Europe']
+]
+
+TOTAL_PREFIX = 'total_quality_articles_about_'
+MOM_PREFIX = 'MoM_net_new_quality_articles_about_'
+
+
+# Calculate MoM, totals and proportions for every month from first_month on (by default,
+# the whole history)
+def calculate_content_gap(df, first_month=None):
+    """
+    Computes the content gap metrics derived from the total_quality_articles_about_*
+    columns: the MoM net new quality articles per category, the underrepresented and all
+    gender/region sums of those, and the share of new articles about gender minorities
+    and underrepresented regions.
+
+    Every month is computed at once with array operations, so after a backfill or a
+    correction of the totals, the derived metrics are consistent for the whole history.
+    Pass first_month to only recompute the months from then on (e.g. the months just
+    added); earlier months are left as they are.
+    """
+    total_columns = [c for c in df.columns if c.startswith(TOTAL_PREFIX)]
+    categories = [c[len(TOTAL_PREFIX):] for c in total_columns]
+    mom_columns = [MOM_PREFIX + category for category in categories]
+
+    if first_month is None:
+        start = 0
+    else:
+        start = int(np.searchsorted(df.index, pd.Period(first_month, "M")))
+    if start >= len(df.index):
+        return df
+
+    # The first recomputed month's MoM difference needs the month before it
+    totals = df[total_columns].to_numpy(dtype=float, na_value=np.nan)[max(start - 1, 0):]
+    mom = np.full(totals.shape, np.nan)
+    mom[1:] = totals[1:] - totals[:-1]
+    if start > 0:
+        mom = mom[1:]
+
+    def sum_of(selected):
+        columns = [categories.index(category) for category in selected if category in categories]
+        # Like DataFrame.sum, missing values count as 0
+        return np.nansum(mom[:, columns], axis=1)
+
+    gender_minorities_sum = sum_of(UNDERREPRESENTED_GENDERS)
+    all_genders_sum = sum_of(GENDER_CATEGORIES)
+    underrepresented_regions_sum = sum_of(UNDERREPRESENTED_REGIONS)
+    all_regions_sum = sum_of(REGION_CATEGORIES)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = pd.DataFrame(
+            {
+                **dict(zip(mom_columns, mom.T)),
+                'gender_minorities_net_new_articles_sum': gender_minorities_sum,
+                'underrepresented_regions_net_new_articles_sum': underrepresented_regions_sum,
+                'all_genders_net_new_articles_sum': all_genders_sum,
+                'all_regions_net_new_articles_sum': all_regions_sum,
+                '%_of_new_articles_about_gender_minorities': gender_minorities_sum / all_genders_sum,
+                '%_of_new_articles_about_underrepresented_regions': underrepresented_regions_sum / all_regions_sum
+            },
+            index=df.index[start:]
+        )
+
+    df = df.copy()
+    for column in derived.columns:
+        if column not in df.columns:
+            df[column] = np.nan
+    df.loc[derived.index, derived.columns] = derived
+    return df
 
-    # Calculate and update the last row for the percentage columns
-    df.at[df.index[-1], '%_of_new_articles_about_gender_minorities'] = df.at[df.index[-1], 'gender_minorities_net_new_articles_sum'] / df.at[df.index[-1], 'all_genders_net_new_articles_sum']
-    df.at[df.index[-1], '%_of_new_articles_about_underrepresented_regions'] = df.at[df.index[-1], 'underrepresented_regions_net_new_articles_sum'] / df.at[df.index[-1], 'all_regions_net_new_articles_sum']
 
-    return df
+# Calculate MoM and totals as well proportions for the last month
+def calculate_mom(df):
+    return calculate_content_gap(df, first_month=df.index[-1])
 
 
 # Calculate monthly and quarterly reporting for content gap metrics
 def calc_content_rpt(df, reporting_period, minorities, totals, index_names):
-    one_year_earlier = subtract_year(reporting_period)
-    one_year_earlier_next_month = one_year_earlier + 1
-
-    forecast_data = {}
-    for column in df.columns:
-        one_year_ago_value = df.at[one_year_earlier, column]
-        one_year_ago_next_month_value = df.at[one_year_earlier_next_month, column]
-
-        if one_year_ago_value == 0:
-            last_year_diff = 0
-        else:
-            last_year_diff = (one_year_ago_next_month_value - one_year_ago_value) / one_year_ago_value
-
-        forecast_col = f"{column}_forecast"
-        forecast_data[forecast_col] = df.at[reporting_period, column] * (1 + last_year_diff)
-
-    current_ratios = {}
-    forecasted_ratios = {}
-    
-    
-    for minor, total, index_name in zip(minorities, totals, index_names):
-        
-        current_ratios[index_name] = df.at[reporting_period, minor] / df.at[reporting_period, total]
-        forecasted_ratios[index_name] = forecast_data[f"{minor}_forecast"] / forecast_data[f"{total}_forecast"]
-
-    # Convert the dictionaries to DataFrames
-    current_df = pd.DataFrame(current_ratios, index=["value"])
-    forecast_df = pd.DataFrame(forecasted_ratios, index=["naive_forecast"])
+    table = reporting_table(
+        df[list(dict.fromkeys(minorities + totals))],
+        ratios=dict(zip(index_names, zip(minorities, totals))),
+        reporting_periods=[reporting_period]
+    )
 
-    # Concatenate the DataFrames vertically
-    result_df = pd.concat([current_df, forecast_df])
-    return result_df
+    return (
+        report_for(table, reporting_period, columns=["value", "naive_forecast"])
+        .loc[index_names]
+        .transpose()
+        .rename_axis(columns=None)
+    )
 
 
 def check_for_incomplete_quarterly_data(df, new_index, quarterly):
@@ -98,12 +127,7 @@ def check_for_incomplete_quarterly_data(df, new_index, quarterly):
     column in the DataFrame is NaN and prints an error message if true. Then computes quarterly averages.
     """
      # Resample and calculate quarterly averages
-    quarterly_averages = (
-        df
-        .reindex(new_index)
-        .resample("Q-JUN")
-        .aggregate(lambda x: x.mean())
-    )  
+    quarterly_averages = fiscal_rollup(df.reindex(new_index), how="mean", skipna=True)
     
     column_name = '%_of_new_articles_about_gender_minorities'
     if pd.isna(quarterly[column_name].iloc[-1]):
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class HTTPCache:
+    """
+    An on-disk cache of HTTP responses, keyed by URL, with one JSON file per response.
+
+    Entries stored as immutable (e.g. API data for closed months, which never changes) are
+    served without contacting the server. Other entries keep their ETag and Last-Modified
+    headers so the server can be asked whether they are still current (see
+    revalidation_headers). When the cache grows beyond max_bytes, the least recently used
+    entries are deleted.
+
+    With offline=True, callers should serve responses only from the cache and never make
+    requests; missing entries then raise a LookupError (see lookup).
+    """
+
+    def __init__(self, directory, max_bytes=200 * 1024 ** 2, offline=False):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.total_bytes = sum(path.stat().st_size for path in self._entry_paths())
+
+    def _entry_paths(self):
+        return self.directory.glob("*.json")
+
+    def _path(self, url):
+        return self.directory / (hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def get(self, url):
+        """
+        Returns the cached entry for a URL (a dict with "status", "headers", "body" and
+        "immutable" keys), or None.
+        """
+        path = self._path(url)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # The modification time records when the entry was last used, for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return entry
+
+    def lookup(self, url):
+        """
+        Like get, but in offline mode a missing entry raises a LookupError.
+        """
+        entry = self.get(url)
+        if entry is None and self.offline:
+            raise LookupError(f"{url} is not in the HTTP cache and the cache is in offline mode")
+
+        return entry
+
+    def put(self, url, status, headers, body, immutable=False):
+        """
+        Stores a response. Only the headers needed for revalidation are kept.
+        """
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": {
+                key: headers[key] for key in ("ETag", "Last-Modified") if key in headers
+            },
+            "body": body,
+            "immutable": immutable,
+            "stored": time.time()
+        }
+        data = json.dumps(entry).encode()
+        path = self._path(url)
+
+        with self.lock:
+            try:
+                self.total_bytes -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+
+            # Write then rename, so a half-written entry is never read back
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self.total_bytes += len(data)
+
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Deletes the least recently used entries until the cache fits in max_bytes.
+        """
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self.total_bytes -= size
+
+
+def revalidation_headers(entry):
+    """
+    Returns the conditional request headers for revalidating a cached entry.
+    """
+    headers = {}
+    if "ETag" in entry["headers"]:
+        headers["If-None-Match"] = entry["headers"]["ETag"]
+    if "Last-Modified" in entry["headers"]:
+        headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+    return headers
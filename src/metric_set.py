@@ -0,0 +1,230 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+import wmfdata as wmf
+from wmfdata.utils import print_err
+
+from src.utils import load_metric_file
+
+# How many queries are run on the cluster at once by default
+DEFAULT_MAX_WORKERS = 4
+
+
+def month_range_params(first_month, last_month):
+    """
+    Returns the parameters the query templates use to select the months from first_month
+    to last_month (inclusive), in the formats the different source tables need.
+    """
+    first_month, last_month = pd.Period(first_month, "M"), pd.Period(last_month, "M")
+
+    return {
+        "range_first_day": str(first_month.asfreq("D", how="start")),
+        "range_last_month_first_day": str(last_month.asfreq("D", how="start")),
+        "range_first_month": str(first_month),
+        "range_last_month": str(last_month),
+        "range_start": str(first_month.start_time),
+        "range_end": str((last_month + 1).start_time),
+        "range_first_year": first_month.year,
+        "range_last_year": last_month.year,
+        "range_first_year_month": first_month.year * 100 + first_month.month,
+        "range_last_year_month": last_month.year * 100 + last_month.month,
+        "range_first_retention_cohort": str(first_month - 2),
+        "range_last_retention_cohort": str(last_month - 2)
+    }
+
+
+def prepare_query(filename, date_params):
+    return (
+        Path(filename)
+        .read_text()
+        .format(**date_params)
+    )
+
+
+class MetricSet:
+    """
+    A MetricSet is a group of monthly metrics that is saved to a single file and
+    which is generated by one or more queries.
+
+    Class assumptions:
+    * Each query contains a "month" column which Pandas can parse into a date.
+    * The column names used in the queries are unique across queries.
+
+    A note on the date formats:
+    The month column is saved to the file as the ISO-8601 date of the start of the
+    month (e.g. 2020-06-01). However, in Python we handle them not as Datetimes but as
+    Periods, since this makes it easy to write code (e.g. utils.calc_rpt) which works
+    both with the normal monthly as well as quarterly aggregates.
+
+    Queries are given as a dict of {name: {"file": path}}. A query can also have its own
+    "cleanup" function, which is used instead of the one passed to run_queries.
+
+    Queries select the months given by the range_* parameters (see month_range_params).
+    By default that is just date_params["metrics_month"], but passing months=(first, last)
+    computes every month in that range with a single grouped query, e.g. to backfill a
+    new metric. Months that already have data are not changed (see add_data).
+
+    If a QuerySpool is given as spool, raw query results are stored in it and reused
+    whenever the same SQL would be run again; cleanup functions are always re-applied.
+    Empty results and results for months which ended recently are not spooled.
+
+    If a MetricStore is given as store, data is loaded from and saved to it, and filename
+    is still written as a TSV export for the charts and reports that read it. The first
+    time, an existing TSV file is imported into the empty store. Values passed to
+    replace_data overwrite the stored ones when saving.
+    """
+
+    def __init__(self, filename, queries, date_params, spool=None, store=None):
+        self.filename = filename
+        self.queries = queries
+        self.date_params = date_params
+        self.spool = spool
+        self.store = store
+        self.latencies = {}
+        # Data passed to replace_data, to overwrite in the store when saving
+        self.replaced = []
+        self.load_data()
+
+    def load_data(self):
+        if self.store is not None:
+            if not self.store.parts() and Path(self.filename).exists():
+                self.store.append(load_metric_file(self.filename))
+            self.data = self.store.read()
+            return
+
+        try:
+            self.data = load_metric_file(self.filename)
+        except FileNotFoundError:
+            self.data = pd.DataFrame()
+
+    def add_data(self, new_data):
+        """
+        Takes a Pandas data frame with a date index giving the month and one or more
+        columns of metrics.
+        """
+        # Our policy is to avoid altering previously-generated data (which can happen
+        # because some of our data sources regenerate history every month). If you do want
+        # to regenerate some data, manually delete it from the data file or, if the set has
+        # a store, with store.delete (deleting it from the TSV export has no effect). To
+        # replace data which has been recomputed, use replace_data.
+
+        # Keep the original order of columns from self.data, with any new metrics (e.g.
+        # one being backfilled) after them
+        original_order = self.data.columns.tolist()
+        new_columns = [c for c in new_data.columns if c not in original_order]
+
+        self.data = self.data.combine_first(new_data)[original_order + new_columns]
+
+    def replace_data(self, new_data):
+        """
+        Takes a data frame like add_data, but replaces any values already present for its
+        months and columns, e.g. derived metrics recomputed for the whole history. With a
+        store, the replaced values are overwritten in it by save_data.
+        """
+        columns = self.data.columns.tolist() + [c for c in new_data.columns if c not in self.data.columns]
+        data = self.data.reindex(index=self.data.index.union(new_data.index), columns=columns)
+        data.loc[new_data.index, new_data.columns] = new_data
+        self.data = data
+        self.replaced.append(new_data)
+
+    def run_query(self, key, cleanup_function=None, months=None):
+        """
+        Runs one of the set's queries for the given (first, last) months, by default the
+        metrics month, and returns its result, ready for add_data.
+        """
+        if months is None:
+            months = (self.date_params["metrics_month"], self.date_params["metrics_month"])
+
+        val = self.queries[key]
+        query = prepare_query(val["file"], {**self.date_params, **month_range_params(*months)})
+
+        result = self.spool.load(query) if self.spool is not None else None
+        if result is not None:
+            print_err(f"Using spooled result of {key} ")
+        else:
+            print_err(f"Running {key} ")
+            result = wmf.spark.run(query)
+            if self.spool is not None and not self.spool.store(query, result, last_month=months[1]):
+                print_err(f"Not spooling {key}, whose data may not be complete yet")
+
+        cleanup_function = val.get("cleanup", cleanup_function)
+        if cleanup_function:
+            result = cleanup_function(result)
+
+        return (
+            result
+            .assign(month=lambda df: pd.to_datetime(df["month"]))
+            .set_index("month")
+            # This dataframe will usually have only a single row (unless a range of
+            # months was queried), so Pandas will not be able to infer the frequency
+            # of the period
+            .to_period("M")
+        )
+
+    def run_queries(self, cleanup_function=None, max_workers=DEFAULT_MAX_WORKERS, months=None):
+        """
+        Runs all the set's queries, up to max_workers at a time, and adds their results.
+        """
+        run_metric_sets(
+            [self],
+            cleanup_function=cleanup_function,
+            max_workers=max_workers,
+            months=months
+        )
+
+    def save_data(self):
+        if self.store is not None:
+            # Only replaced and new values are written to the store
+            for new_data in self.replaced:
+                self.store.overwrite(new_data)
+            self.replaced = []
+            self.store.append(self.data)
+            self.store.export_tsv(self.filename, columns=self.data.columns.tolist())
+            return
+
+        self.data.to_timestamp().to_csv(self.filename, sep="\t")
+
+
+def run_metric_sets(metric_sets, cleanup_function=None, max_workers=DEFAULT_MAX_WORKERS, months=None):
+    """
+    Runs the queries of several MetricSets concurrently, with at most max_workers queries
+    running at a time, and reports how long each one took (also stored in each set's
+    latencies dict).
+
+    Results are added to their sets once every query has finished, in the order the sets
+    and their queries were given, so the outcome doesn't depend on which query finished
+    first. If a query fails, the error is raised after the running queries have finished,
+    and no results are added.
+
+    months is passed on to MetricSet.run_query.
+    """
+    tasks = [(metric_set, key) for metric_set in metric_sets for key in metric_set.queries]
+    results = {}
+
+    def run(metric_set, key):
+        start = time.perf_counter()
+        result = metric_set.run_query(key, cleanup_function, months)
+        return result, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run, metric_set, key): (metric_set, key)
+            for metric_set, key in tasks
+        }
+        try:
+            for future in as_completed(futures):
+                metric_set, key = futures[future]
+                result, seconds = future.result()
+                metric_set.latencies[key] = seconds
+                print_err(f"Finished {key} in {seconds:.1f} s")
+                results[(id(metric_set), key)] = result
+        except Exception:
+            # Don't start queries whose results would be thrown away
+            for future in futures:
+                future.cancel()
+            raise
+
+    for metric_set, key in tasks:
+        metric_set.add_data(results[(id(metric_set), key)])
@@ -0,0 +1,222 @@
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PART_PATTERN = re.compile(r"part-(\d+)\.parquet")
+
+# Key of the metadata each part stores in its Parquet schema: whether it overrides earlier
+# parts, and the dtypes its metrics had when they were saved
+METADATA_KEY = b"metric_store"
+
+
+class MetricStore:
+    """
+    Stores a set of monthly metrics (e.g. a MetricSet's data) as a directory of Parquet
+    part files.
+
+    append only writes the values which are new (new months, or new metrics for existing
+    months) to a new part, so saving never rewrites history. When reading, parts are
+    combined in the order they were written, with earlier values taking precedence, which
+    matches MetricSet.add_data's policy of never altering previously-generated data.
+
+    To regenerate data on purpose, delete the stored values for some months and metrics
+    (they are then stored again the next time they are appended), or overwrite them, e.g.
+    with derived metrics recomputed for some months. Both write a new part which takes
+    precedence over the parts before it, so they don't rewrite history either; compact
+    combines all the parts into one.
+
+    Each part also records the dtypes its metrics had, so metrics are read and exported
+    with the dtype they were last saved with (e.g. integer counts stay integers).
+
+    Data is returned with a monthly PeriodIndex named "month", like load_metric_file, and
+    read can load just some of the metrics. export_tsv writes the existing wide TSV layout.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def parts(self):
+        """
+        Returns the paths of the part files, in the order they were written.
+        """
+        if not self.directory.exists():
+            return []
+
+        parts = [
+            (int(match.group(1)), path)
+            for path in self.directory.iterdir()
+            if (match := PART_PATTERN.fullmatch(path.name))
+        ]
+        return [path for _, path in sorted(parts)]
+
+    def _new_part_path(self):
+        parts = self.parts()
+        number = int(PART_PATTERN.fullmatch(parts[-1].name).group(1)) + 1 if parts else 0
+        return self.directory / f"part-{number:05d}.parquet"
+
+    def _part_metadata(self, schema):
+        metadata = (schema.metadata or {}).get(METADATA_KEY)
+        return json.loads(metadata) if metadata else {"override": False, "dtypes": {}}
+
+    def _write_part(self, data, override=False, dtypes=None):
+        """
+        Writes data (indexed by month) to a new part and returns its path.
+        """
+        table = pa.Table.from_pandas(
+            data.sort_index().to_timestamp().rename_axis("month").reset_index(),
+            preserve_index=False
+        )
+        metadata = {"override": override, "dtypes": dtypes or {}}
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            METADATA_KEY: json.dumps(metadata).encode()
+        })
+
+        path = self._new_part_path()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, path)
+        return path
+
+    def columns(self):
+        """
+        Returns the names of all stored metrics, in the order they were first stored.
+        """
+        columns = []
+        for path in self.parts():
+            for name in pq.read_schema(path).names:
+                if name != "month" and name not in columns:
+                    columns.append(name)
+
+        return columns
+
+    def dtypes(self):
+        """
+        Returns the dtype each stored metric had when it was last saved.
+        """
+        dtypes = {}
+        for path in self.parts():
+            dtypes.update(self._part_metadata(pq.read_schema(path))["dtypes"])
+
+        return dtypes
+
+    def read(self, columns=None):
+        """
+        Returns the stored metrics (or only the given columns) as a data frame indexed by
+        month, each with the dtype it was last saved with.
+        """
+        data = pd.DataFrame(index=pd.PeriodIndex([], freq="M", name="month"))
+        dtypes = {}
+
+        for path in self.parts():
+            schema = pq.read_schema(path)
+            metadata = self._part_metadata(schema)
+            dtypes.update(metadata["dtypes"])
+            part_columns = [c for c in schema.names if c != "month" and (columns is None or c in columns)]
+            if not part_columns:
+                continue
+
+            part = (
+                pd.read_parquet(path, columns=["month"] + part_columns)
+                .set_index("month")
+                .to_period("M")
+            )
+            if metadata["override"]:
+                # Every value in an override part replaces the earlier one, even if missing
+                data = data.reindex(
+                    index=data.index.union(part.index),
+                    columns=data.columns.union(part.columns, sort=False)
+                )
+                data.loc[part.index, part.columns] = part
+            else:
+                data = data.combine_first(part)
+
+        if columns is None:
+            columns = self.columns()
+
+        # Values which have all been deleted aren't stored
+        data = data.dropna(how="all").dropna(axis=1, how="all")
+        data = data.reindex(columns=[c for c in columns if c in data.columns])
+
+        # Missing values can't be held in numpy integer columns
+        return data.astype({
+            c: "Int64" if pd.api.types.is_integer_dtype(dtype) and data[c].isna().any() else dtype
+            for c, dtype in dtypes.items()
+            if c in data.columns
+        })
+
+    def append(self, data):
+        """
+        Writes the values in data (indexed by month) which are not stored yet to a new part
+        and returns its path, or None if there was nothing new.
+        """
+        stored = self.read(columns=data.columns.tolist())
+        new_values = data.where(stored.reindex(index=data.index, columns=data.columns).isna())
+        new_values = new_values.dropna(how="all").dropna(axis=1, how="all")
+        if new_values.empty:
+            return None
+
+        return self._write_part(
+            new_values,
+            dtypes={c: str(data[c].dtype) for c in new_values.columns}
+        )
+
+    def compact(self):
+        """
+        Rewrites all parts as a single part, e.g. after many months of appends.
+        """
+        parts = self.parts()
+        if len(parts) <= 1:
+            return
+
+        # Write everything to a new part before deleting the old ones, so the data can
+        # always be read in full
+        data = self.read()
+        if not data.empty:
+            self._write_part(data, dtypes={c: d for c, d in self.dtypes().items() if c in data.columns})
+        for part in parts:
+            part.unlink()
+
+    def delete(self, months=None, columns=None):
+        """
+        Deletes the stored values for the given (first, last) months (inclusive; by
+        default all of them) of the given metrics (by default all of them), so that they
+        are stored anew the next time they are appended. Returns the path of the part
+        recording the deletion, or None if nothing was stored there.
+        """
+        stored = self.read(columns)
+        rows = slice(None) if months is None else slice(*(pd.Period(m, "M") for m in months))
+        deleted = stored.loc[rows]
+        if deleted.empty:
+            return None
+
+        return self._write_part(
+            pd.DataFrame(np.nan, index=deleted.index, columns=deleted.columns),
+            override=True
+        )
+
+    def overwrite(self, data):
+        """
+        Replaces the stored values for the months and metrics in data (indexed by month)
+        with data's values, including missing ones, unlike append, which never changes
+        stored values. Returns the path of the new part, or None if data is empty.
+        """
+        if data.empty:
+            return None
+
+        return self._write_part(
+            data,
+            override=True,
+            dtypes={c: str(data[c].dtype) for c in data.columns}
+        )
+
+    def export_tsv(self, filename, columns=None):
+        """
+        Writes the stored metrics to a TSV file in the layout of MetricSet.save_data, with
+        the dtypes they were saved with.
+        """
+        self.read(columns).to_timestamp().to_csv(filename, sep="\t")
@@ -0,0 +1,318 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.http_cache import revalidation_headers
+
+NEW_PAGES_API = (
+    "https://wikimedia.org/api/rest_v1/metrics/"
+    "edited-pages/new/{project}/all-editor-types/{page_type}/monthly/{start}/{end}"
+)
+
+# The Wikimedia User-Agent policy asks for a UA identifying the tool and how to reach its
+# maintainers: https://meta.wikimedia.org/wiki/User-Agent_policy
+USER_AGENT = "https://github.com/wikimedia-research/movement-metrics (bot)"
+
+# Status codes worth retrying: rate limited or a (usually transient) server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket: allows bursts of up to `burst` requests, refilled at
+    `rate` requests per second.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a request may be made.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def api_date(month):
+    """
+    Returns the first day of a monthly period in the API's YYYYMMDD format.
+    """
+    return month.asfreq("D", how="start").strftime("%Y%m%d")
+
+
+def missing_months(data, column, first_month, last_month):
+    """
+    Returns the months from first_month to last_month (inclusive) for which a metrics
+    data frame (e.g. MetricSet.data) has no value in the given column.
+    """
+    months = pd.period_range(first_month, last_month, freq="M", name="month")
+    if column not in data.columns:
+        return months
+
+    return months.difference(data[column].dropna().index)
+
+
+def parse_new_pages(response_json):
+    """
+    Turns an edited-pages/new API response into a data frame with a monthly period index
+    and a "new_pages" column.
+    """
+    frame = pd.DataFrame(response_json["items"][0]["results"])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"]).dt.tz_localize(None)
+    return (
+        frame
+        .rename(columns={"timestamp": "month"})
+        .set_index("month")
+        .to_period("M")
+    )
+
+
+def is_final(start, end, response_json):
+    """
+    Checks whether a response has data for every month from start to end, all of which
+    have closed, so it will never change.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    months = pd.period_range(start, end - pd.Timedelta(days=1), freq="M")
+    closed = end <= pd.Timestamp.today().normalize().replace(day=1)
+
+    return closed and len(response_json["items"][0]["results"]) == len(months)
+
+
+def empty_result():
+    """
+    Returns a data frame shaped like NewPagesFetcher.get_many's results, with no rows.
+    """
+    return pd.DataFrame(
+        {"new_pages": pd.Series(dtype="int64"), "project": pd.Series(dtype="object")},
+        index=pd.PeriodIndex([], freq="M", name="month")
+    )
+
+
+class NewPagesFetcher:
+    """
+    Fetches new page counts from the AQS edited-pages/new endpoint, for one project or
+    many projects concurrently.
+
+    All requests share one pooled HTTP session and are throttled by a token bucket
+    (`rate` requests per second, bursts of up to `burst`). Rate limited (429) and server
+    error responses, as well as connection errors, are retried with exponential backoff,
+    honouring any Retry-After header. `api_url` can be pointed at a local stub server
+    for testing.
+
+    If an HTTPCache is given as `cache`, responses are stored in it. Complete responses
+    for closed months are reused without any request; others (e.g. for the current month)
+    are revalidated with the server. If the cache is offline, nothing is requested at all.
+    """
+
+    def __init__(
+        self,
+        api_url=NEW_PAGES_API,
+        user_agent=USER_AGENT,
+        max_workers=8,
+        rate=50,
+        burst=10,
+        max_retries=5,
+        backoff=0.5,
+        timeout=30,
+        cache=None
+    ):
+        self.api_url = api_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.limiter = RateLimiter(rate, burst)
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        # One pooled connection per worker, so connections are reused rather than reopened
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                # Retry-After can also be an HTTP date, in which case fall back to backoff
+                pass
+        return self.backoff * 2 ** attempt
+
+    def get(self, url, headers=None):
+        """
+        Makes a rate-limited GET request, retrying transient failures. Returns the final
+        response; raises if it is still failing after max_retries retries.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                r = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            if r.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(self._retry_delay(attempt, r))
+                continue
+
+            return r
+
+    def get_new_pages(self, start, end, project="all-projects", page_type="content"):
+        """
+        Returns new pages per month for one project between start and end (in the API's
+        YYYYMMDD format), or None if the API has no data for the project.
+        """
+        url = self.api_url.format(
+            project=project,
+            page_type=page_type,
+            start=start,
+            end=end
+        )
+        if self.cache is None:
+            r = self.get(url)
+            if r.status_code == 404:
+                return None
+
+            r.raise_for_status()
+            return parse_new_pages(r.json())
+
+        status, body = self._get_cached(url, start, end)
+        if status == 404:
+            return None
+
+        return parse_new_pages(json.loads(body))
+
+    def _get_cached(self, url, start, end):
+        """
+        Returns the status and body of the response for a URL, using the cache where
+        possible.
+        """
+        entry = self.cache.lookup(url)
+        if entry is not None and (entry["immutable"] or self.cache.offline):
+            return entry["status"], entry["body"]
+
+        r = self.get(url, headers=revalidation_headers(entry) if entry is not None else None)
+        if r.status_code == 304 and entry is not None:
+            return entry["status"], entry["body"]
+
+        if r.status_code == 404:
+            self.cache.put(url, r.status_code, r.headers, r.text)
+            return r.status_code, r.text
+
+        r.raise_for_status()
+        self.cache.put(
+            url,
+            r.status_code,
+            r.headers,
+            r.text,
+            immutable=is_final(start, end, r.json())
+        )
+        return r.status_code, r.text
+
+    def get_many(self, projects, start, end, page_type="content", progress_every=50):
+        """
+        Fetches new pages for many projects concurrently (at most max_workers requests
+        in flight). Returns one data frame with a "project" column, with projects in the
+        order given; projects without data are left out.
+        """
+        projects = list(projects)
+        n = len(projects)
+        done = 0
+        done_lock = threading.Lock()
+
+        def fetch(project):
+            nonlocal done
+            frame = self.get_new_pages(start, end, project=project, page_type=page_type)
+            with done_lock:
+                done += 1
+                if progress_every and done % progress_every == 0:
+                    print(f"Fetched {done} of {n} projects")
+            return frame
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            frames = list(executor.map(fetch, projects))
+
+        results = [
+            frame.assign(project=project)
+            for project, frame in zip(projects, frames)
+            if frame is not None
+        ]
+
+        if not results:
+            return empty_result()
+
+        return pd.concat(results)
+
+    def get_months(self, months, project="all-projects", page_type="content"):
+        """
+        Returns new pages for the given months (e.g. from missing_months) using a single
+        request spanning all of them, or None if there is nothing to fetch. The result has
+        one row per month, so it can be passed straight to MetricSet.add_data.
+        """
+        months = pd.PeriodIndex(months, freq="M")
+        if len(months) == 0:
+            return None
+
+        frame = self.get_new_pages(
+            api_date(months.min()),
+            api_date(months.max() + 1),
+            project=project,
+            page_type=page_type
+        )
+        if frame is None:
+            return None
+
+        # The range may span months that are already present; only return the ones asked for
+        return frame[frame.index.isin(months)]
+
+    def get_many_months(self, projects, months, page_type="content", progress_every=50):
+        """
+        Like get_many, but for the given months, with a single request per project
+        spanning all of them.
+        """
+        months = pd.PeriodIndex(months, freq="M")
+        if len(months) == 0:
+            return empty_result()
+
+        frame = self.get_many(
+            projects,
+            api_date(months.min()),
+            api_date(months.max() + 1),
+            page_type=page_type,
+            progress_every=progress_every
+        )
+
+        return frame[frame.index.isin(months)]
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
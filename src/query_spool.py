@@ -0,0 +1,71 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+# Days after the end of a month before its source data is taken to be complete
+SETTLE_DAYS = 7
+
+
+class QuerySpool:
+    """
+    Keeps the raw result of every query run by a MetricSet as a Parquet file, keyed by a
+    hash of the query file's contents and the parameters it was rendered with (i.e. of
+    the exact SQL that was run).
+
+    Running the same SQL again loads the stored result instead of querying the cluster,
+    so post-processing (cleanup functions, calculations in the notebook) can be changed
+    and re-run cheaply. Set refresh=True to run every query again and replace the stored
+    results, e.g. if source data was corrected after it was first queried.
+
+    Results which may still change are not stored: empty results, and results covering a
+    month which ended less than settle_days ago, whose source tables may not be complete
+    yet. Those queries are run again every time until their data has settled.
+    """
+
+    def __init__(self, directory, refresh=False, settle_days=SETTLE_DAYS):
+        self.directory = Path(directory)
+        self.refresh = refresh
+        self.settle_days = settle_days
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, query):
+        return hashlib.sha256(query.encode()).hexdigest()
+
+    def path(self, query):
+        return self.directory / (self.key(query) + ".parquet")
+
+    def load(self, query):
+        """
+        Returns the stored result of a query, or None if it has to be run.
+        """
+        path = self.path(query)
+        if self.refresh or not path.exists():
+            return None
+
+        return pd.read_parquet(path)
+
+    def is_settled(self, last_month):
+        """
+        Checks whether the source data for last_month (and any earlier month) should be
+        complete by now.
+        """
+        settled_at = (pd.Period(last_month, "M") + 1).start_time + pd.Timedelta(days=self.settle_days)
+        return pd.Timestamp.now() >= settled_at
+
+    def store(self, query, result, last_month=None):
+        """
+        Stores the result of a query, unless it is empty or last_month (the last month the
+        query covers, if given) hasn't settled yet. Returns whether it was stored.
+        """
+        if result.empty or (last_month is not None and not self.is_settled(last_month)):
+            return False
+
+        path = self.path(query)
+        # Write then rename, so a half-written result is never read back
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        result.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return True
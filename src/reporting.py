@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Periods per year of the index frequencies reports are made for
+PERIODS_PER_YEAR = {"M": 12, "Q": 4, "A": 1, "Y": 1}
+
+REPORT_COLUMNS = ["value", "year_over_year_change", "previous_period_change", "naive_forecast"]
+
+
+def _periods_per_year(index):
+    return PERIODS_PER_YEAR[index.freqstr[0]]
+
+
+def _lagged(values, lag):
+    """
+    Returns values (an array of periods x metrics) shifted down by lag periods, with NaN
+    where there is no earlier period.
+    """
+    lagged = np.full(values.shape, np.nan)
+    if lag < len(values):
+        lagged[lag:] = values[:len(values) - lag]
+
+    return lagged
+
+
+def _naive_forecast(values, periods_per_year):
+    """
+    Forecasts the period after each one by applying last year's change between the same
+    two periods, e.g. the change from 2022Q1 to 2022Q2 to the value for 2023Q1. A change
+    from 0 is taken to be no change.
+    """
+    one_year_ago = _lagged(values, periods_per_year)
+    one_year_ago_next = _lagged(values, periods_per_year - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        last_year_diff = np.where(one_year_ago == 0, 0, (one_year_ago_next - one_year_ago) / one_year_ago)
+
+    return values * (1 + last_year_diff)
+
+
+def reporting_table(df, ratios=None, reporting_periods=None):
+    """
+    Calculates the report metrics for every column of df (a data frame of monthly or
+    quarterly metrics with a PeriodIndex, e.g. from rollup.fiscal_rollup) and every
+    reporting period at once:
+
+    * value: the metric in the reporting period
+    * year_over_year_change: the change from the same period a year earlier
+    * previous_period_change: the change from the previous period (month or quarter)
+    * naive_forecast: the forecast for the next period (see _naive_forecast)
+
+    ratios is a dict of {name: (numerator, denominator)} giving metrics which are the
+    ratio of two columns, such as the share of new articles about gender minorities. A
+    ratio's forecast is the ratio of its columns' forecasts. A ratio replaces any column
+    of df with the same name.
+
+    Returns a tidy data frame with a (reporting_period, metric) index and the above
+    columns. Pass reporting_periods to only keep some periods, and use report_for to get
+    the report for a single period.
+    """
+    # Lags are taken by position, so make sure no periods are skipped
+    index = pd.period_range(df.index[0], df.index[-1], freq=df.index.freq)
+    df = df.reindex(index).drop(columns=[name for name in (ratios or {}) if name in df.columns])
+    periods_per_year = _periods_per_year(index)
+    values = df.to_numpy(dtype=float, na_value=np.nan)
+    forecasts = _naive_forecast(values, periods_per_year)
+    metrics = df.columns.tolist()
+
+    if ratios:
+        numerators = [df.columns.get_loc(numerator) for numerator, _ in ratios.values()]
+        denominators = [df.columns.get_loc(denominator) for _, denominator in ratios.values()]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.hstack([values, values[:, numerators] / values[:, denominators]])
+            forecasts = np.hstack([forecasts, forecasts[:, numerators] / forecasts[:, denominators]])
+        metrics += list(ratios)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        year_over_year_change = values / _lagged(values, periods_per_year) - 1
+        previous_period_change = values / _lagged(values, 1) - 1
+
+    # Periods vary slowest, so each period's metrics are together
+    table = pd.DataFrame(
+        {
+            "value": values.ravel(),
+            "year_over_year_change": year_over_year_change.ravel(),
+            "previous_period_change": previous_period_change.ravel(),
+            "naive_forecast": forecasts.ravel()
+        },
+        index=pd.MultiIndex.from_product([index, metrics], names=["reporting_period", "metric"])
+    )
+
+    if reporting_periods is not None:
+        table = table.loc[list(reporting_periods)]
+
+    return table
+
+
+def report_for(table, reporting_period, columns=REPORT_COLUMNS):
+    """
+    Returns one reporting period's report from a reporting_table, with a row per metric.
+    """
+    return table.xs(reporting_period, level="reporting_period")[columns]
@@ -0,0 +1,89 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Months in each period of the fiscal frequencies we report on
+MONTHS_PER_PERIOD = {"Q": 3, "A": 12, "Y": 12}
+
+
+def _months_per_period(freq):
+    months = MONTHS_PER_PERIOD.get(pd.tseries.frequencies.to_offset(freq).rule_code[0])
+    if months is None:
+        raise ValueError(f"Can only roll up monthly metrics to quarters or years, not {freq}")
+
+    return months
+
+
+def _period_blocks(df, freq):
+    """
+    Returns the fiscal periods df's months fall in, and its values as an array of shape
+    (periods, months per period, columns), with missing months as NaN.
+    """
+    months_per_period = _months_per_period(freq)
+    first_period = df.index[0].asfreq(freq)
+    last_period = df.index[-1].asfreq(freq)
+
+    # Pad the ends with months so that every period is complete
+    months = pd.period_range(first_period.start_time, last_period.end_time, freq="M")
+    periods = pd.period_range(first_period, last_period, freq=freq)
+    values = (
+        df
+        .reindex(months)
+        .to_numpy(dtype=float, na_value=np.nan)
+        .reshape(len(periods), months_per_period, len(df.columns))
+    )
+
+    return periods, values
+
+
+def fiscal_rollup(df, how="mean", freq="Q-JUN", skipna=False):
+    """
+    Rolls monthly metrics (a data frame with a monthly PeriodIndex, e.g. from
+    utils.load_all_metric_files) up to fiscal quarters (the default, "Q-JUN") or fiscal
+    years ("A-JUN"), for all columns at once.
+
+    how is "mean", "sum" or "last" (the value of the period's last month). By default,
+    a period with any month missing is NaN rather than a misleading value based on
+    partial data, like resampling with lambda x: x.mean(skipna=False). With skipna=True,
+    periods are aggregated from the months which are present, and are only NaN if none
+    are. See months_present to tell the two apart.
+    """
+    periods, values = _period_blocks(df, freq)
+
+    with warnings.catch_warnings():
+        # All-NaN periods give NaN, which is what we want
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        if how == "mean":
+            result = np.nanmean(values, axis=1) if skipna else values.mean(axis=1)
+        elif how == "sum":
+            result = values.sum(axis=1)
+            if skipna:
+                present = ~np.isnan(values)
+                result = np.where(present.any(axis=1), np.nansum(values, axis=1), np.nan)
+        elif how == "last":
+            if skipna:
+                present = ~np.isnan(values)
+                # Position of the last present month, counted from the end of the period
+                from_end = np.argmax(present[:, ::-1, :], axis=1)
+                last = values.shape[1] - 1 - from_end
+                result = np.take_along_axis(values, last[:, np.newaxis, :], axis=1)[:, 0, :]
+            else:
+                result = values[:, -1, :]
+        else:
+            raise ValueError(f"how must be 'mean', 'sum' or 'last', not {how!r}")
+
+    return pd.DataFrame(result, index=periods, columns=df.columns)
+
+
+def months_present(df, freq="Q-JUN"):
+    """
+    Returns how many months of each fiscal period have data, for every column.
+    """
+    periods, values = _period_blocks(df, freq)
+    return pd.DataFrame(
+        (~np.isnan(values)).sum(axis=1),
+        index=periods,
+        columns=df.columns
+    )
@@ -1,8 +1,8 @@
 from .wikicharts import Wikichart
-import pandas as pd
+from .render_cache import render_key, is_fresh
+from . import datasets
 from .config import wmf_colors
 from datetime import datetime
-import matplotlib.pyplot as plt
 from .parameters import editing_data_path
 
 
@@ -15,16 +15,16 @@ def main():
     display_flag = True
 
     #---CLEAN DATA--
-    df = pd.read_csv(editing_data_path, sep='\t')
-
-
     start_date = "2019-01-01"
     end_date = datetime.today()
-    df['month'] = pd.to_datetime(df['month'])
-    df = df[df["month"].isin(pd.date_range(start_date, end_date))]
+    df = datasets.load_range(editing_data_path, start_date, end_date, columns=['active_editors'])
+
+    cache_key = render_key(df, script=__file__)
+    if is_fresh(save_file_name, cache_key):
+        return
 
     #---MAKE CHART---
-    chart = Wikichart(start_date,end_date,df)
+    chart = Wikichart(start_date,end_date,df,derivatives=datasets.derivatives(editing_data_path))
     chart.init_plot()
     
     chart.plot_line('month','active_editors',wmf_colors['blue'])
@@ -39,7 +39,7 @@ def main():
         num_annotation=chart.calc_yoy(y='active_editors',
                                       yoy_note=yoy_note))
     
-    chart.finalize_plot(save_file_name,display=display_flag)
+    chart.finalize_plot(save_file_name, display=display_flag, cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
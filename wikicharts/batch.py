@@ -0,0 +1,160 @@
+"""
+Renders every wikicharts chart in a process pool.
+
+Run from the root of the repository (chart modules use paths relative to it):
+
+    python -m wikicharts.batch                      # all charts
+    python -m wikicharts.batch active_editors maps  # selected charts
+    python -m wikicharts.batch --jobs 4
+"""
+import argparse
+import ast
+import importlib
+import os
+import sys
+import time
+import traceback
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).parent
+
+# A module is a chart job if it defines a top-level main() and draws with one of these
+CHART_CLASS_MODULES = {"wikicharts", "wikimap"}
+
+
+@dataclass
+class JobResult:
+    """The outcome of rendering one chart module."""
+    name: str
+    seconds: float = 0.0
+    outputs: list = field(default_factory=list)
+    cached: list = field(default_factory=list)
+    error: str = None
+
+
+def _is_chart_module(path):
+    """Checks whether a module source file defines a chart job, without importing it."""
+    tree = ast.parse(path.read_text())
+    has_main = any(
+        isinstance(node, ast.FunctionDef) and node.name == "main"
+        for node in tree.body
+    )
+    uses_chart_class = any(
+        isinstance(node, ast.ImportFrom) and node.level == 1 and node.module in CHART_CLASS_MODULES
+        for node in tree.body
+    )
+    return has_main and uses_chart_class
+
+
+def discover_jobs():
+    """Returns the sorted names of all chart modules in the wikicharts package."""
+    return sorted(
+        path.stem
+        for path in PACKAGE_DIR.glob("*.py")
+        if _is_chart_module(path)
+    )
+
+
+def _init_worker(use_cache=True):
+    """Sets up a pool worker to render without a display.
+
+    matplotlib isn't imported here: jobs whose charts are up to date never need it, so
+    the backend is chosen through the environment for when a chart does import it.
+    """
+    os.environ["MPLBACKEND"] = "Agg"
+    if "matplotlib" in sys.modules:
+        import matplotlib
+        matplotlib.use("Agg")
+    # Chart modules call plt.show(), which only warns under Agg
+    warnings.filterwarnings("ignore", message=".*non-interactive.*")
+    from . import render_cache
+    render_cache.enabled = use_cache
+    # Workers never show figures, so they don't need pyplot's figure manager
+    from .wikicharts import Wikichart
+    Wikichart.use_pyplot = False
+
+
+def run_job(name):
+    """Imports a chart module, runs its main() and reports the files it wrote."""
+    from . import outputs
+
+    outputs.saved_files.clear()
+    outputs.cached_files.clear()
+    result = JobResult(name)
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(f"{__package__}.{name}")
+        module.main()
+    except Exception:
+        result.error = traceback.format_exc()
+    finally:
+        # Pool workers are reused between jobs, so don't let figures pile up
+        plt = sys.modules.get("matplotlib.pyplot")
+        if plt is not None:
+            plt.close("all")
+    result.seconds = time.perf_counter() - start
+    result.outputs = sorted(outputs.saved_files)
+    result.cached = sorted(outputs.cached_files)
+    return result
+
+
+def render_all(names=None, max_workers=None, use_cache=True):
+    """Renders the given chart modules (default: all of them) in a process pool.
+
+    Results are returned in the order of names, regardless of which job finished first.
+    Charts whose inputs haven't changed since the last run are skipped unless use_cache
+    is False.
+    """
+    if names is None:
+        names = discover_jobs()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(use_cache,)) as executor:
+        return list(executor.map(run_job, names))
+
+
+def print_summary(results, wall_seconds):
+    """Prints wall time and output files per job, plus any errors."""
+    width = max(len(r.name) for r in results)
+    for r in results:
+        status = "FAILED" if r.error else f"{len(r.outputs)} file(s), {len(r.cached)} up to date"
+        print(f"{r.name:<{width}}  {r.seconds:7.1f}s  {status}")
+        for path in r.outputs:
+            print(f"{'':<{width}}            {path}")
+    total = sum(r.seconds for r in results)
+    print(f"\n{len(results)} jobs, {total:.1f}s of rendering in {wall_seconds:.1f}s wall time")
+    for r in results:
+        if r.error:
+            print(f"\n--- {r.name} ---\n{r.error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render wikicharts charts in parallel.")
+    parser.add_argument("charts", nargs="*", help="chart modules to render (default: all)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="re-render charts even if their inputs haven't changed")
+    parser.add_argument("--list", action="store_true", help="list chart modules and exit")
+    args = parser.parse_args()
+
+    available = discover_jobs()
+    if args.list:
+        print("\n".join(available))
+        return
+
+    unknown = set(args.charts) - set(available)
+    if unknown:
+        parser.error(f"unknown chart module(s): {', '.join(sorted(unknown))}")
+
+    start = time.perf_counter()
+    results = render_all(args.charts or available, max_workers=args.jobs, use_cache=not args.no_cache)
+    print_summary(results, time.perf_counter() - start)
+    if any(r.error for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,82 @@
-from matplotlib import font_manager
+import dataclasses
+import json
+import os
+import threading
+from pathlib import Path
 
 
 # Font setup
 font_dirs = ["wikicharts/resources/fonts/"]
-font_files = font_manager.findSystemFonts(fontpaths=font_dirs)
-for font_file in font_files:
-    font_manager.fontManager.addfont(font_file)
+font_extensions = (".ttf", ".otf")
+
+# Bump to invalidate every process's cached font list
+FONT_CACHE_VERSION = 1
+
+_fonts_registered = False
+_fonts_lock = threading.Lock()
+
+
+def _font_files():
+    """Returns the font files in font_dirs with their modification times and sizes."""
+    files = []
+    for font_dir in font_dirs:
+        for dirpath, _, filenames in os.walk(font_dir):
+            for filename in filenames:
+                if filename.lower().endswith(font_extensions):
+                    path = os.path.abspath(os.path.join(dirpath, filename))
+                    stat = os.stat(path)
+                    files.append([path, stat.st_mtime_ns, stat.st_size])
+    return sorted(files)
+
+
+def register_fonts():
+    """Makes the fonts in font_dirs (Montserrat) available to matplotlib.
+
+    Only does anything the first time it is called in a process. Reading the font files'
+    properties is the slow part, so they are cached in matplotlib's cache directory and
+    only read again when the font files (or matplotlib) change.
+    """
+    global _fonts_registered
+    if _fonts_registered:
+        return
+
+    with _fonts_lock:
+        if _fonts_registered:
+            return
+
+        import matplotlib
+        from matplotlib import font_manager
+
+        files = _font_files()
+        cache_path = Path(matplotlib.get_cachedir()) / "wikicharts-fonts.json"
+        cache_id = [FONT_CACHE_VERSION, matplotlib.__version__, files]
+        try:
+            cached = json.loads(cache_path.read_text())
+            entries = cached["entries"] if cached["id"] == cache_id else None
+        except (OSError, ValueError, KeyError):
+            entries = None
+
+        if entries is None:
+            entries = [
+                dataclasses.asdict(font_manager.ttfFontProperty(font_manager.get_font(path)))
+                for path, _, _ in files
+            ]
+            # Write then rename, so other processes never read a half-written file
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            try:
+                tmp_path.write_text(json.dumps({"id": cache_id, "entries": entries}))
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass
+
+        # Same as fontManager.addfont, without opening the files
+        registered = {entry.fname for entry in font_manager.fontManager.ttflist}
+        for entry in entries:
+            if entry["fname"] not in registered:
+                font_manager.fontManager.ttflist.append(font_manager.FontEntry(**entry))
+        font_manager.fontManager._findfont_cached.cache_clear()
+
+        _fonts_registered = True
 
 
 wmf_colors = {
@@ -45,6 +116,20 @@ wmf_regions = [
     "Sub-Saharan Africa"
 ]
 
+# How regions are written in metric column names (e.g. "south_asia_unique_devices")
+wmf_region_keys = {
+    "central_eastern_europe_central_asia": "Central & Eastern Europe & Central Asia",
+    "east_southeast_asia_pacific": "East, Southeast Asia, & Pacific",
+    "latin_america_caribbean": "Latin America & Caribbean",
+    "middle_east_north_africa": "Middle East & North Africa",
+    "north_america": "North America",
+    "northern_western_europe": "Northern & Western Europe",
+    "south_asia": "South Asia",
+    "subsaharan_africa": "Sub-Saharan Africa",
+    "unclassed": "Unclassed",
+    "unknown": "Unknown"
+}
+
 
 key_colors = [
     wmf_colors['red'], 
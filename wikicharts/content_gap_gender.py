@@ -1,8 +1,9 @@
 from .wikicharts import Wikichart
+from .render_cache import render_key, is_fresh
 import pandas as pd
+from . import datasets
 from .config import wmf_colors
 from datetime import datetime
-import matplotlib.pyplot as plt
 
 from .parameters import content_gap_data_path
 
@@ -14,14 +15,16 @@ def main():
     save_file_name = "Women_Percentage_Distribution.png"
     
     #-- CLEAN DATA--
-    df = pd.read_csv(content_gap_data_path, sep='\t')
-
     start_date = '2022-01'
     end_date = datetime.today()
 
-    df['month'] = pd.to_datetime(df['month'])
-    df = df[df["month"].isin(pd.date_range(start_date, end_date))]
-    
+    df = datasets.load_range(content_gap_data_path, start_date, end_date,
+                             columns=['%_of_new_articles_about_gender_minorities'])
+
+    cache_key = render_key(df, script=__file__)
+    if is_fresh(save_file_name, cache_key):
+        return
+
     #---MAKE CHART---
     df['timestamp'] = pd.to_datetime(df['month'], format='%Y-%m')
     chart = Wikichart(start_date, end_date, df, time_col='month')
@@ -30,7 +33,7 @@ def main():
     chart.plot_line('month', '%_of_new_articles_about_gender_minorities', 
                     wmf_colors['blue'])
     
-    plt.scatter(df['month'], df['%_of_new_articles_about_gender_minorities'], 
+    chart.gca().scatter(df['month'], df['%_of_new_articles_about_gender_minorities'], 
                 color=wmf_colors['blue'], 
                 zorder=5)
     
@@ -42,7 +45,7 @@ def main():
             y='%_of_new_articles_about_gender_minorities',
             use_last_y=True,
             perc = True)
-    chart.finalize_plot(save_file_name)
+    chart.finalize_plot(save_file_name, cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
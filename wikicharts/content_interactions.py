@@ -1,8 +1,11 @@
 from .wikicharts import Wikichart
+from .render_cache import render_key, is_fresh
 import pandas as pd
+from . import datasets
 from .config import wmf_colors
 from datetime import datetime
 from .parameters import readers_data_path
+from .data_utils import as_float_columns
 import numpy as np
 
 def main():
@@ -13,18 +16,16 @@ def main():
     display_flag = True
 
     #---CLEAN DATA--
-    df = pd.read_csv(readers_data_path, sep='\t')
- 
-    corrected_df = pd.read_csv('wikicharts/resources/data/corrected_metrics_only.csv', 
-                               sep=',')
     start_date = "2018-05-01"
     end_date = datetime.today()
-    df['month'] = pd.to_datetime(df['month'])
     
+    corrected_df = pd.read_csv('wikicharts/resources/data/corrected_metrics_only.csv', 
+                               sep=',')
     corrected_df['month'] = pd.to_datetime(corrected_df['month'])
     corrected_df.set_index('month')
     
-    df = df[df["month"].isin(pd.date_range(start_date, end_date))]
+    # Corrected values are written into these columns below, so they are loaded as plain floats
+    df = as_float_columns(datasets.load_range(readers_data_path, start_date, end_date, columns=['interactions']))
     
     # Combine datasets — add corrected values to the reader metrics dataset
     df['interactions_corrected'] = df['interactions']
@@ -35,6 +36,10 @@ def main():
         correct_row = corrected_df.loc[corrected_df['month'] ==  m]
         df.loc[row_index, 'interactions_corrected'] = correct_row['interactions_corrected'].values
 
+    cache_key = render_key(df, corrected_df, script=__file__)
+    if is_fresh(save_file_name, cache_key):
+        return
+
     #---MAKE CHART---
     
     chart = Wikichart(start_date,end_date,df)
@@ -55,7 +60,7 @@ def main():
         y='interactions_corrected',
         num_annotation=chart.calc_yoy(y='interactions_corrected'))
     
-    chart.finalize_plot(save_file_name,display=display_flag)
+    chart.finalize_plot(save_file_name, display=display_flag, cache_key=cache_key)
     
     
     
@@ -1,9 +1,15 @@
 import re
 import math
 from math import ceil, floor, log10
+import numpy as np
 import pandas as pd
 from dateutil.relativedelta import relativedelta
-import shapely
+
+# Order of magnitude at which each abbreviation starts, largest first
+ORDER_SUFFIXES = [(12, 'T'), (9, 'B'), (6, 'M'), (3, 'K')]
+
+# Trailing zeros after a decimal point (and the point itself if nothing else is left)
+TAIL_DOT_RGX = re.compile(r'(?:(\.)|(\.\d*?[1-9]\d*?))0+(?=\b|[^0-9])')
 
 
 def simple_num_format(value, round_sigfigs=False, sig=2, perc=False, sign=False):
@@ -41,12 +47,90 @@ def simple_num_format(value, round_sigfigs=False, sig=2, perc=False, sign=False)
         multiplier = 1
         
     formatted_value = formatting.format(value * multiplier)
-    tail_dot_rgx = re.compile(r'(?:(\.)|(\.\d*?[1-9]\d*?))0+(?=\b|[^0-9])')
-    label = tail_dot_rgx.sub(r'\2', formatted_value)
+    label = TAIL_DOT_RGX.sub(r'\2', formatted_value)
     if sign and value > 0:
         label = "+" + label
     return label
 
+def _round_sigfigs(values, sig):
+    """Rounds an array to sig significant figures, with the same results as Python's round (zeros stay zero)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        order = np.floor(np.log10(np.abs(values)))
+    digits = np.where(values == 0, 0, sig - order - 1)
+    # Powers of ten are exact up to 1e22, so dividing rather than multiplying by
+    # 1e-n keeps large numbers exact
+    scale = 10.0 ** np.abs(digits)
+    scaled = np.where(digits >= 0, values * scale, values / scale)
+    rounded = np.rint(scaled)
+    rounded = np.where(digits >= 0, rounded / scale, rounded * scale)
+
+    # round works from the exact decimal value, so decide values near a tie with it
+    ties = np.flatnonzero(np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6)
+    for i in ties:
+        rounded[i] = round(float(values[i]), int(digits[i]))
+    return rounded
+
+def _labels(values, format_finite):
+    """Applies format_finite to the finite values of a Series or array and returns the labels the same way, with NaN for values that aren't finite (including pd.NA)."""
+    array = pd.Series(values).to_numpy(dtype=float, na_value=np.nan)
+    labels = np.full(array.shape, np.nan, dtype=object)
+    finite = np.isfinite(array)
+    labels[finite] = format_finite(array[finite])
+    if isinstance(values, pd.Series):
+        return pd.Series(labels, index=values.index, name=values.name)
+    return labels
+
+def simple_num_format_array(values, round_sigfigs=False, sig=2, perc=False, sign=False):
+    """Formats a Series or array of numbers for labels in one pass, with the same labels as simple_num_format.
+
+    Values that aren't finite get NaN labels and zeros can be rounded, where simple_num_format would raise.
+    """
+    def format_finite(values):
+        if round_sigfigs:
+            values = _round_sigfigs(values, sig)
+
+        if perc:
+            return _integer_labels(values * 100) + "%"
+
+        magnitude = np.abs(values)
+        with np.errstate(divide='ignore'):
+            order = np.where(values == 0, 1, np.floor(np.log10(magnitude)))
+        multipliers = np.ones(values.shape)
+        suffixes = np.full(values.shape, '', dtype=object)
+        for min_order, suffix in reversed(ORDER_SUFFIXES):
+            at_least = order >= min_order
+            multipliers[at_least] = float(f'1e-{min_order}')
+            suffixes[at_least] = suffix
+
+        labels = _integer_labels(values * multipliers) + suffixes
+        if sign:
+            labels = np.where(values > 0, "+" + labels, labels)
+        return labels
+
+    return _labels(values, format_finite)
+
+def _integer_labels(values):
+    """Formats an array of floats like '{:1.0f}' does, which rounds half to even like np.rint."""
+    rounded = np.rint(values)
+    labels = np.empty(values.shape, dtype=object)
+    fits = np.abs(rounded) < 2 ** 63
+    labels[fits] = rounded[fits].astype(np.int64).astype(str)
+    labels[~fits] = ['{:1.0f}'.format(value) for value in values[~fits]]
+    # Values that round to zero from below keep their sign
+    labels[(rounded == 0) & np.signbit(rounded)] = '-0'
+    return labels
+
+def as_float_columns(df):
+    """Returns df with nullable integer and float32 columns (see datasets.compact_dtypes) as float64, with missing values as NaN, which is what matplotlib can plot."""
+    columns = [
+        c for c in df.columns
+        if pd.api.types.is_numeric_dtype(df[c])
+        and (pd.api.types.is_extension_array_dtype(df[c]) or df[c].dtype == "float32")
+    ]
+    if not columns:
+        return df
+    return df.astype({c: "float64" for c in columns})
+
 def split_df_by_col(df, index_column_name = "month", cols_per_df = 4):
     """Splits a DataFrame into multiple DataFrames, each with up to four columns plus an index column for use in plotting."""
     num_charts = len(df.columns) - 1
@@ -71,6 +155,20 @@ def format_perc(x, sig=2, sign=True):
         rounded = "{0:.2g}".format(round(x, sig-int(floor(log10(abs(x))))-1))
         return rounded + "%"
 
+def format_perc_array(values, sig=2, sign=True):
+    """Formats a Series or array of numbers as percentages in one pass, with the same labels as format_perc.
+
+    Values that aren't finite get NaN labels and zeros are formatted, where format_perc would raise.
+    """
+    formatting = "{0:+.2g}%" if sign else "{0:.2g}%"
+
+    def format_finite(values):
+        # After rounding there are only a few distinct values, so format each once
+        distinct, positions = np.unique(_round_sigfigs(values, sig), return_inverse=True)
+        return np.array([formatting.format(value) for value in distinct], dtype=object)[positions]
+
+    return _labels(values, format_finite)
+
 def gen_keys(dfs, key_colors, index_column_name = "month"):
     """Generates a list of DataFrames, each representing a key for a subplot with column labels and colors."""
     keys = []
@@ -127,7 +225,7 @@ def change_over_time(var, change_var_name, data_df, region_table_local, days_del
     growth_df = growth_df.rename(columns={var_x:"current",var_y:"prev"})
     growth_df = growth_df.drop(columns=['month_x','month_y'])
     growth_df[change_var_name] = (growth_df["current"] - growth_df["prev"]) / growth_df["prev"]
-    growth_df[growth_var_label] = (growth_df[change_var_name] * 100).map(format_perc)
+    growth_df[growth_var_label] = format_perc_array(growth_df[change_var_name] * 100)
     region_table_local = region_table_local.merge(growth_df.drop(columns=["current", "prev"]), how='left', on="region")
     
     return region_table_local
@@ -135,5 +233,7 @@ def change_over_time(var, change_var_name, data_df, region_table_local, days_del
 
 def adjust_label_position(region, region_table, x=0, y=0):
     """Adjusts label positions on a map chart for a given region."""
+    # Only maps need shapely, so line charts don't import it
+    import shapely
     current = region_table.at[region, 'centroid']
     region_table.at[region, 'centroid'] = shapely.Point(current.x + x, current.y + y)
\ No newline at end of file
@@ -0,0 +1,163 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .data_utils import as_float_columns
+from .derivatives import Derivatives
+
+# How many parsed files are kept in memory at once; the least recently used is dropped first
+max_entries = 8
+
+# (path, sep, date column, compact) -> ((mtime, size), parsed frame, whether it has every column)
+_cache = OrderedDict()
+
+# Same keys as _cache -> ((mtime, size), Derivatives of every numeric column)
+_derivatives = OrderedDict()
+
+
+def _signature(path):
+    """Returns what identifies a version of a file: its modification time and size."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _integer_dtype(values):
+    """Returns the smallest nullable integer dtype that holds values, or None if they aren't all whole numbers."""
+    present = values[~np.isnan(values)]
+    if not np.array_equal(present, np.round(present)):
+        return None
+    for dtype in ["Int8", "Int16", "Int32", "Int64"]:
+        info = np.iinfo(dtype.lower())
+        if present.size == 0 or (present.min() >= info.min and present.max() <= info.max):
+            return dtype
+    return None
+
+
+def _fits_float32(values):
+    """Checks whether every value reads back unchanged from the shortest float32 representation."""
+    narrowed = values.astype(np.float32).astype(str).astype(np.float64)
+    return np.array_equal(narrowed, values, equal_nan=True)
+
+
+def compact_dtypes(df, exclude=()):
+    """Returns df with each column stored in the smallest dtype that keeps its values.
+
+    Whole-number columns (counts, even if read as floats because of missing values)
+    become nullable integers, other numbers become float32 if no written digits are lost,
+    and text columns with repeated values (e.g. region labels) become categoricals.
+    """
+    dtypes = {}
+    for column in df.columns:
+        if column in exclude:
+            continue
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_extension_array_dtype(series):
+            continue
+        if pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+            dtype = _integer_dtype(values)
+            if dtype is None and _fits_float32(values):
+                dtype = "float32"
+            if dtype is not None:
+                dtypes[column] = dtype
+        elif pd.api.types.is_object_dtype(series) and series.nunique() <= len(series) // 2:
+            dtypes[column] = "category"
+
+    return df.astype(dtypes) if dtypes else df
+
+
+def _read(path, sep, date_col, columns, compact):
+    usecols = None if columns is None else [date_col] + columns
+    df = pd.read_csv(path, sep=sep, usecols=usecols)
+    df[date_col] = pd.to_datetime(df[date_col])
+    if compact:
+        df = compact_dtypes(df, exclude=[date_col])
+    return df
+
+
+def load(path, date_col="month", columns=None, sep="\t", compact=True):
+    """Returns a metric file as a DataFrame with date_col parsed as dates.
+
+    Each file is read and parsed once per process; later calls return the same frame
+    until the file changes on disk. The frame is shared, so don't modify it — use
+    load_range to get a copy to work on.
+
+    If columns is given, only those columns are read (plus date_col), and the frame may
+    also hold columns other callers asked for. Columns which haven't been read yet are
+    read on their own and added to the cached frame. With compact=True, columns are
+    stored in compact dtypes (see compact_dtypes).
+    """
+    key = (os.path.abspath(path), sep, date_col, compact)
+    signature = _signature(path)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] != signature:
+        cached = None
+
+    if cached is not None:
+        _, df, complete = cached
+        missing = [] if complete or columns is None else [c for c in columns if c not in df.columns and c != date_col]
+        if complete or (columns is not None and not missing):
+            _cache.move_to_end(key)
+            return df
+        if columns is None:
+            df, complete = _read(path, sep, date_col, None, compact), True
+        else:
+            # Rows line up, since both frames were read from the same version of the file
+            new = _read(path, sep, date_col, missing, compact)
+            df = pd.concat([df, new.drop(columns=date_col)], axis=1)
+    else:
+        projection = None if columns is None else [c for c in columns if c != date_col]
+        df, complete = _read(path, sep, date_col, projection, compact), columns is None
+
+    _cache[key] = (signature, df, complete)
+    _cache.move_to_end(key)
+    while len(_cache) > max_entries:
+        _cache.popitem(last=False)
+    return df
+
+
+def load_range(path, start_date, end_date, date_col="month", columns=None, sep="\t", compact=True):
+    """Returns the rows of a metric file from start_date to end_date (inclusive).
+
+    Selects the same rows as filtering with isin(pd.date_range(start_date, end_date)) on
+    monthly data. columns limits the result (and what is read from the file) to some
+    columns; date_col is always kept. The result is the caller's to modify.
+    """
+    df = load(path, date_col=date_col, columns=columns, sep=sep, compact=compact)
+    dates = df[date_col]
+    mask = (dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date)) & (dates == dates.dt.normalize())
+    if columns is not None:
+        df = df[[date_col] + [c for c in columns if c != date_col]]
+    # Boolean indexing already copies the rows, so a shallow copy is enough to detach it
+    return df[mask].copy(deep=False)
+
+
+def derivatives(path, date_col="month", sep="\t", compact=True):
+    """Returns the Derivatives (rolling means, YoY changes...) of every numeric column of a metric file.
+
+    They are built once per version of the file, like load's frames, and each derivative
+    is computed for the whole file the first time a chart or map asks for it. Charts and
+    maps use views of them for their own months and metrics (see Derivatives.view and
+    Wikichart's derivatives argument).
+    """
+    key = (os.path.abspath(path), sep, date_col, compact)
+    signature = _signature(path)
+    cached = _derivatives.get(key)
+    if cached is None or cached[0] != signature:
+        df = load(path, date_col=date_col, sep=sep, compact=compact)
+        values = as_float_columns(df).set_index(date_col).select_dtypes("number")
+        cached = (signature, Derivatives(values))
+        _derivatives[key] = cached
+
+    _derivatives.move_to_end(key)
+    while len(_derivatives) > max_entries:
+        _derivatives.popitem(last=False)
+    return cached[1]
+
+
+def clear():
+    """Drops every cached file and its derivatives."""
+    _cache.clear()
+    _derivatives.clear()
@@ -0,0 +1,127 @@
+import pandas as pd
+
+
+class Derivatives():
+    """Series derived from monthly metrics: rolling means, changes over time and same-month-of-year values.
+
+    Takes a wide frame indexed by month (one column per metric) and computes each
+    derivative for every column at once, the first time it is asked for. Changes are
+    taken between months by date, so line charts and maps that use them agree on the
+    numbers.
+
+    datasets.derivatives keeps one for each metric file, of which charts and maps take
+    views (see view) for their own months and metrics.
+    """
+    def __init__(self, values):
+        self.values = values
+        self._computed = {}
+
+    def _memoized(self, key, compute):
+        if key not in self._computed:
+            self._computed[key] = compute()
+        return self._computed[key]
+
+    def shifted(self, months):
+        """Returns each month's values from the given number of months earlier (NaN where there are none)."""
+        return self._memoized(
+            ("shifted", months),
+            lambda: self.values.shift(freq=pd.DateOffset(months=months)).reindex(self.values.index)
+        )
+
+    def change(self, months):
+        """Returns the relative change of every metric from the given number of months earlier (0.1 is +10%)."""
+        def compute():
+            earlier = self.shifted(months)
+            return (self.values - earlier) / earlier
+        return self._memoized(("change", months), compute)
+
+    def yoy(self):
+        """Returns the year-over-year change of every metric."""
+        return self.change(12)
+
+    def mom(self):
+        """Returns the month-over-month change of every metric."""
+        return self.change(1)
+
+    def rolling_mean(self, window):
+        """Returns the rolling mean of every metric over the given number of months."""
+        return self._memoized(("rolling_mean", window), lambda: self.values.rolling(window).mean())
+
+    def rolling(self, window):
+        """Returns the derivatives of the rolling mean over the given number of months."""
+        return self._memoized(("rolling", window), lambda: Derivatives(self.rolling_mean(window)))
+
+    def same_month(self, month):
+        """Returns the values for one month of the year (1-12) in every year."""
+        return self._memoized(
+            ("same_month", month),
+            lambda: self.values[self.values.index.month == month]
+        )
+
+    def yoy_points(self):
+        """Returns the values for the last month and the same month a year earlier."""
+        last = self.values.index[-1]
+        return self.values.reindex([last - pd.DateOffset(years=1), last])
+
+    def view(self, start=None, end=None, columns=None):
+        """Returns a view of the derivatives from start to end (inclusive) for some metrics (see DerivativesView)."""
+        return DerivativesView(self, start, end, columns)
+
+
+class DerivativesView():
+    """The derivatives of some months and metrics of a Derivatives, e.g. of a whole metric file, as one chart uses them.
+
+    Has the same methods as Derivatives, which return slices of the full derivatives, so
+    each is computed once however many views use it. Changes in the first months of the
+    view are taken from the months before it. columns is a list of metrics or a dict
+    renaming them ({metric: name in the view}); metrics which aren't there are all NaN.
+    """
+    def __init__(self, derivatives, start=None, end=None, columns=None):
+        self.derivatives = derivatives
+        self.start = start
+        self.end = end
+        self.columns = dict(zip(columns, columns)) if isinstance(columns, list) else columns
+
+    def _slice(self, frame, months=True):
+        if months:
+            frame = frame.loc[self.start:self.end]
+        if self.columns is not None:
+            frame = frame.reindex(columns=list(self.columns)).set_axis(list(self.columns.values()), axis=1)
+        return frame
+
+    @property
+    def values(self):
+        return self._slice(self.derivatives.values)
+
+    def shifted(self, months):
+        return self._slice(self.derivatives.shifted(months))
+
+    def change(self, months):
+        return self._slice(self.derivatives.change(months))
+
+    def yoy(self):
+        return self.change(12)
+
+    def mom(self):
+        return self.change(1)
+
+    def rolling_mean(self, window):
+        return self._slice(self.derivatives.rolling_mean(window))
+
+    def rolling(self, window):
+        return DerivativesView(self.derivatives.rolling(window), self.start, self.end, self.columns)
+
+    def same_month(self, month):
+        return self._slice(self.derivatives.same_month(month))
+
+    def yoy_points(self):
+        last = self.values.index[-1]
+        return self._slice(self.derivatives.values.reindex([last - pd.DateOffset(years=1), last]), months=False)
+
+    def view(self, start=None, end=None):
+        """Returns a view of the same metrics for the months from start to end within this view."""
+        if start is None or (self.start is not None and pd.Timestamp(self.start) > pd.Timestamp(start)):
+            start = self.start
+        if end is None or (self.end is not None and pd.Timestamp(self.end) < pd.Timestamp(end)):
+            end = self.end
+        return DerivativesView(self.derivatives, start, end, self.columns)
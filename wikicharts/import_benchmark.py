@@ -0,0 +1,89 @@
+"""
+Measures how long a fresh interpreter takes to import each chart module, which is what
+every batch renderer worker pays before its first job.
+
+Run from the root of the repository:
+
+    python -m wikicharts.import_benchmark                  # all chart modules
+    python -m wikicharts.import_benchmark active_editors --repeat 10
+    python -m wikicharts.import_benchmark --max-seconds 0.2
+
+Importing a chart module (maps included) must not import matplotlib.pyplot or the
+geospatial packages, since charts that are up to date are skipped without drawing anything.
+The benchmark fails if one does, or if --max-seconds is given and a module takes longer
+than that on top of importing pandas, which every chart needs.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from .batch import discover_jobs
+
+# Modules only needed once a chart or map is drawn
+HEAVY_MODULES = ["matplotlib.pyplot", "shapely", "geopandas"]
+
+_MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module, repeat=5):
+    """Imports a module in repeat fresh interpreters and returns the median seconds and the modules it loaded.
+
+    Raises ImportError with the interpreter's last line of output if the import fails.
+    """
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _MEASURE.format(module=module)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise ImportError(result.stderr.strip().splitlines()[-1])
+        report = json.loads(result.stdout)
+        times.append(report["seconds"])
+    return statistics.median(times), set(report["modules"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of wikicharts chart modules.")
+    parser.add_argument("charts", nargs="*", help="chart modules to measure (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module (default: 5)")
+    parser.add_argument("--max-seconds", type=float,
+                        help="fail if a module takes longer than this to import, not counting pandas")
+    args = parser.parse_args()
+
+    names = args.charts or discover_jobs()
+    baseline, _ = measure("pandas", args.repeat)
+    print(f"{'pandas (baseline)':<36}  {baseline:6.3f}s")
+
+    failures = []
+    for name in names:
+        try:
+            seconds, modules = measure(f"{__package__}.{name}", args.repeat)
+        except ImportError as e:
+            print(f"{name:<36}  failed: {e}")
+            failures.append(f"{name} can't be imported")
+            continue
+        overhead = seconds - baseline
+        heavy = [m for m in HEAVY_MODULES if m in modules]
+        print(f"{name:<36}  {seconds:6.3f}s  ({overhead:+.3f}s){'  imports ' + ', '.join(heavy) if heavy else ''}")
+
+        if heavy:
+            failures.append(f"{name} imports {', '.join(heavy)}")
+        if args.max_seconds is not None and overhead > args.max_seconds:
+            failures.append(f"{name} takes {overhead:.3f}s to import, more than {args.max_seconds}s")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
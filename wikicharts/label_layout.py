@@ -0,0 +1,21 @@
+import numpy as np
+
+
+def spread_positions(positions, min_distance):
+    """Returns positions (e.g. of labels, in points) moved up as little as needed for each to be at least min_distance above the one below it.
+
+    Positions are returned in their original order and labels keep their order from
+    bottom to top. Missing (NaN) positions are left as they are. Sorting is the most
+    expensive step, so placing N labels takes O(N log N).
+    """
+    positions = np.asarray(positions, dtype=float)
+    spread = positions.copy()
+    present = np.flatnonzero(~np.isnan(positions))
+    order = present[np.argsort(positions[present], kind="stable")]
+
+    # Going up from the bottom, each label goes at its own position or min_distance
+    # above the label below it, whichever is higher. That is the running maximum of
+    # the positions with min_distance taken off for each label below.
+    steps = min_distance * np.arange(len(order))
+    spread[order] = np.maximum.accumulate(positions[order] - steps) + steps
+    return spread
@@ -1,17 +1,16 @@
 from .wikimap import Wikimap
 import pandas as pd
-import geopandas as gpd
-import numpy as np
 from datetime import date
-import wmfdata as wmf
-
-from shapely.ops import unary_union
 import warnings
 from .config import wmf_regions
-from .data_utils import simple_num_format, format_perc, change_over_time, adjust_label_position
+from .data_utils import simple_num_format_array, format_perc_array, change_over_time
 from .parameters import unique_devices_data_path
+from . import datasets
+from .metric_cube import MetricCube, regional_unique_devices_parser, dimension_columns
+from .region_geometry import load_region_layer
+from .render_cache import render_key, is_fresh
 
-def main():
+def main(refresh_regions=False):
     home_dir = ''
 
     warnings.filterwarnings("ignore")
@@ -20,67 +19,22 @@ def main():
 
     current_month = date.today().month
 
-    #---WMF REGION DATA---
-    wmf_region_ref = wmf.presto.run("""
-        SELECT
-            name,
-            iso_alpha3_code,
-            wikimedia_region AS region
-        FROM canonical_data.countries
-    """)
-
-     #---MAP (Borders) AND POPULATION DATA---
-    raw_map_df = gpd.read_file(gpd.datasets.get_path('naturalearth_lowres')) 
-    map_df = raw_map_df[(raw_map_df.name != "Antarctica")]
-    
-    # match up wmf region data in wmf_region_ref with geographic data in map_df
-    map_df = map_df.merge(wmf_region_ref, how='left', left_on="iso_a3", right_on="iso_alpha3_code")
-    map_df = map_df[['name_x','iso_a3', 'pop_est', 'gdp_md_est', 'geometry', 'region']]
-    map_df = map_df.rename(columns={"name_x": "name"})
-    
-    region_table = pd.pivot_table(
-        map_df,
-        values='pop_est',
-        index=['region'],
-        aggfunc=np.sum
-    )
-    
-    region_table = region_table.rename(columns={'pop_est': 'sum_pop_est'})
-    
-    # Generate regional linestrings
-    region_table['geometry'] = ''
-    for region in wmf_regions:
-        region_df = map_df.loc[map_df['region'] == region]
-        region_polys = region_df['geometry'].values.tolist()
-        region_boundary = gpd.GeoSeries(unary_union(region_polys))
-        region_table.at[region,'geometry'] = region_boundary
-    
-    # Get representative centroid xys for each region
-    region_table['centroid'] = region_table['geometry'].apply(lambda g: g.centroid)
+    #---MAP (Borders), WMF REGION AND POPULATION DATA---
+    # Stored on disk and only rebuilt (querying canonical_data.countries) when the source data changes
+    map_df, region_table, region_layer_digest = load_region_layer(refresh=refresh_regions)
 
     #---READER DATA---
     # Wrangle into expected format with columns "month", "region", and "unique_devices"
-    reader_df = (
-        pd
-        .read_csv(unique_devices_data_path, sep="\t", parse_dates=["month"])
-        .set_index("month")
-        
+    reader_cube = MetricCube.from_wide(
+        pd.read_csv(unique_devices_data_path, sep="\t", parse_dates=["month"]).set_index("month"),
         # Go from e.g. "northern_western_europe_unique_devices" to "Northern & Western Europe"
-        .rename(lambda c: c.replace("_unique_devices", ""), axis=1)
-        .rename({
-            'subsaharan_africa': 'Sub-Saharan Africa',
-            'latin_america_caribbean': 'Latin America & Caribbean',
-            'middle_east_north_africa': 'Middle East & North Africa',
-            'south_asia': 'South Asia',
-            'north_america': 'North America',
-            'east_southeast_asia_pacific': 'East, Southeast Asia, & Pacific',
-            'northern_western_europe': 'Northern & Western Europe',
-            'central_eastern_europe_central_asia': 'Central & Eastern Europe & Central Asia'
-        }, axis=1)
-        .rename_axis("region", axis=1)
-        .stack()
-        .rename("unique_devices")
-        .reset_index()
+        regional_unique_devices_parser
+    )
+    reader_df = reader_cube.long("unique_devices", dimension_name="region")
+    # The same derivatives of the file as the line charts use, with region names as columns
+    reader_file_derivatives = datasets.derivatives(unique_devices_data_path)
+    reader_derivatives = reader_file_derivatives.view(
+        columns=dimension_columns(reader_file_derivatives.values.columns, "unique_devices", regional_unique_devices_parser)
     )
 
     # Merge last month's values into regions table
@@ -97,15 +51,21 @@ def main():
 
     #---EDITOR DATA---
     # Wrangle into expected format with columns "month", "region", and "active_editors"
-    editor_df = (
+    editor_wide = (
         pd
         .read_csv(home_dir + 'wikicharts/resources/data/regional_editor_metrics.tsv', sep='\t', parse_dates=["month"])
         .set_index("month")
+    )
+    editor_df = (
+        editor_wide
         .rename_axis("region", axis=1)
         .stack()
         .rename("active_editors")
         .reset_index()
     )
+    editor_derivatives = datasets.derivatives(
+        home_dir + 'wikicharts/resources/data/regional_editor_metrics.tsv'
+    ).view(columns=wmf_regions)
 
     # Merge last month's values into regions table
     editor_last_month = editor_df.iloc[-1]['month']
@@ -143,23 +103,23 @@ def main():
     )
 
     #---VALUES---
-    region_table['pop_label'] = region_table['sum_pop_est'].apply(simple_num_format, round_sigfigs=True)
-    region_table['ud_label'] = region_table['unique_devices'].apply(simple_num_format, round_sigfigs=True)
-    region_table['ed_label'] = region_table['active_editors'].apply(simple_num_format, round_sigfigs=True)
-    region_table['sqc_label'] = region_table['standard_quality_count'].apply(simple_num_format, round_sigfigs=True)
+    region_table['pop_label'] = simple_num_format_array(region_table['sum_pop_est'], round_sigfigs=True)
+    region_table['ud_label'] = simple_num_format_array(region_table['unique_devices'], round_sigfigs=True)
+    region_table['ed_label'] = simple_num_format_array(region_table['active_editors'], round_sigfigs=True)
+    region_table['sqc_label'] = simple_num_format_array(region_table['standard_quality_count'], round_sigfigs=True)
 
     #---PERCENT OF TOTAL---
     region_table['pop_perc'] = region_table['sum_pop_est'] / region_table['sum_pop_est'].sum()
-    region_table['pop_perc_label'] = (region_table["pop_perc"] * 100).apply(format_perc, sign=False)
+    region_table['pop_perc_label'] = format_perc_array(region_table["pop_perc"] * 100, sign=False)
     
     region_table['ud_perc'] = region_table['unique_devices'] / region_table['unique_devices'].sum()
-    region_table['ud_perc_label'] = (region_table['ud_perc'] * 100).apply(format_perc, sign=False)
+    region_table['ud_perc_label'] = format_perc_array(region_table['ud_perc'] * 100, sign=False)
     
     region_table['ed_perc'] = region_table['active_editors'] / region_table['active_editors'].sum()
-    region_table['ed_perc_label'] = (region_table['ed_perc'] * 100).apply(format_perc, sign=False)
+    region_table['ed_perc_label'] = format_perc_array(region_table['ed_perc'] * 100, sign=False)
     
     region_table['sqc_perc'] = region_table['standard_quality_count'] / region_table['standard_quality_count'].sum()
-    region_table['sqc_perc_label'] = (region_table['sqc_perc'] * 100).apply(format_perc, sign=False)
+    region_table['sqc_perc_label'] = format_perc_array(region_table['sqc_perc'] * 100, sign=False)
 
    
 
@@ -168,21 +128,14 @@ def main():
     region_table = change_over_time("standard_quality_count", "sqc_yoy", content_df, region_table, years_delta=1)
 
     #---YOY of ROLLING AVERAGE---
-    reader_pivot = pd.pivot_table(reader_df, values='unique_devices', index=['month'], columns=['region'], aggfunc=np.sum)
-    reader_rolling3mo = reader_pivot.apply(lambda x: x.rolling(window=3).mean()).reset_index()
-    reader_rolling3mo = pd.melt(reader_rolling3mo, id_vars="month", value_vars=wmf_regions)
-    editor_pivot = pd.pivot_table(editor_df, values='active_editors', index=['month'], columns=['region'], aggfunc=np.sum)
-    editor_rolling3mo = editor_pivot.apply(lambda x: x.rolling(window=3).mean()).reset_index()
-    editor_rolling3mo = pd.melt(editor_rolling3mo, id_vars="month", value_vars=wmf_regions)
-    
-    # YOY of Rolling Average
-    # Merge pivot table with map data again — for generating colorbar
-    # Need to drop the geometry data from region_table or you will end up with a regular dataframe instead of a geoseries dataframe
-    region_table = change_over_time("value", "ud_3morolling_yoy", reader_rolling3mo, region_table, years_delta=1)
-    region_table = change_over_time("value", "ed_3morolling_yoy", editor_rolling3mo, region_table, years_delta=1)
+    # Same derivatives as the line charts use, for the last month of each dataset
+    for col, derivatives in [("ud_3morolling_yoy", reader_derivatives), ("ed_3morolling_yoy", editor_derivatives)]:
+        last_yoy = derivatives.rolling(3).yoy().iloc[-1]
+        region_table[col] = region_table['region'].map(last_yoy)
+        region_table[col + "_label"] = region_table['region'].map(format_perc_array(last_yoy * 100))
 
     #---REMERGE W MAP_DF---
-    map_df = map_df.merge(region_table.drop(columns=['geometry','centroid']), how='left', on="region")
+    map_df = map_df.merge(region_table.drop(columns=['geometry','boundary','centroid']), how='left', on="region")
 
 
     #---ADDITIONAL LABELS---
@@ -190,145 +143,76 @@ def main():
     # requires a region column
     region_table = region_table.set_index("region", drop=False)
 
-    # Manually adjust label positions (very complicated to do programmatically in matplotlib and not necessary)
-    adjust_label_position('Middle East & North Africa', region_table = region_table, y=3)
-    adjust_label_position('South Asia', region_table = region_table, y=-3)
-    adjust_label_position('Northern & Western Europe', region_table = region_table, x=15, y=-18)
-    adjust_label_position('Central & Eastern Europe & Central Asia', region_table = region_table, y=2)
-        
-
-   #---MAKE CHART---
-    #---BLANK MAP WITH REGIONS LABELS---
-    chart = Wikimap(
-        map_df, fignum=0, title ='WMF Regions',
-        data_source="geopandas", month=current_month,
-        display_month=False
-    )
-    chart.plot_regions(region_table, 'region', fontsize=10)
-    chart.format_map(format_colobar=False)
-    save_file_name = "Map_RegionNames.png"
-    chart.finalize_plot(save_file_name, display=True)
-
-    #---WORLD POPULATION---
-    chart = Wikimap(
-        map_df, fignum=1, title='World Population',
-        data_source="geopandas", month=current_month
-    )
-    chart.plot_wcolorbar(col = 'sum_pop_est')
-    chart.plot_regions(region_table, 'pop_label')
-    chart.format_map()
-    save_file_name = "Map_WorldPop.png"
-    chart.finalize_plot(save_file_name,display=True)
-
-    #---WORLD POPULATION - PERCENT---
-    chart = Wikimap(
-        map_df, fignum=2, title = 'World Population - Percent of Total',
-        data_source="geopandas", month=current_month
-    )
-    chart.plot_wcolorbar(col = 'pop_perc')
-    chart.plot_regions(region_table, 'pop_perc_label')
-    chart.format_map(cbar_perc=True)
-    save_file_name = "Map_WorldPopPerc.png"
-    chart.finalize_plot(save_file_name, display=True)
-
-    #---READER METRICS - UNIQUE DEVICES---
-    chart = Wikimap(
-        map_df, fignum=3, title='Unique Devices',
-        data_source="geopandas", month=reader_last_month
-    )
-    chart.plot_wcolorbar(col = 'unique_devices')
-    chart.plot_regions(region_table, 'ud_label')
-    chart.format_map()
-    save_file_name = "Map_UniqueDevices.png"
-    chart.finalize_plot(save_file_name, display=True)
-
-    #---READER METRICS - UNIQUE DEVICES PERCENT---
-    chart = Wikimap(
-        map_df, fignum=4, title='Unique Devices - Percent of Total',
-        data_source="geopandas", month=reader_last_month
-    )
-    chart.plot_wcolorbar(col='ud_perc')
-    chart.plot_regions(region_table, 'ud_perc_label')
-    chart.format_map(cbar_perc=True)
-    save_file_name = "Map_UniqueDevicesPerc.png"
-    chart.finalize_plot(save_file_name, display=True)
-    
-    #---READER METRICS - UNIQUE DEVICES YOY of 3MO ROLLING Average---
-    chart = Wikimap(
-        map_df, fignum=6, title='Unique Devices - YoY of 3 Month Rolling Average',
-        data_source="geopandas", month=reader_last_month
-    )
-    chart.plot_wcolorbar(col='ud_3morolling_yoy')
-    chart.plot_regions(region_table, 'ud_3morolling_yoy_label')
-    chart.format_map(cbar_perc=True)
-    save_file_name = "Map_UniqueDevicesYoy.png"
-    chart.finalize_plot(save_file_name, display=True)
-
-    #---EDITOR METRICS - ACTIVE MONTHLY EDITORS---
-    chart = Wikimap(
-        map_df, fignum=7, title='Active Editors',
-        data_source="geopandas", month=editor_last_month
-    )
-    chart.plot_wcolorbar(col='active_editors')
-    chart.plot_regions(region_table, 'ed_label')
-    chart.format_map()
-    save_file_name = "Map_Editors.png"
-    chart.finalize_plot(save_file_name, display=True)
 
-    #---EDITOR METRICS - ACTIVE MONTHLY EDITORS PERC---
-    chart = Wikimap(
-        map_df, fignum=8, title='Active Editors - Percent of Total',
-        data_source="geopandas", month=editor_last_month
-    )
-    chart.plot_wcolorbar(col='ed_perc')
-    chart.plot_regions(region_table, 'ed_perc_label')
-    chart.format_map(cbar_perc=True)
-    save_file_name = "Map_EditorsPerc.png"
-    chart.finalize_plot(save_file_name, display=True)
-    
-    #---EDITOR METRICS - EDITORS YOY of 3MO ROLLING Average---
-    chart = Wikimap(
-        map_df, fignum=6, title='Active Monthly Editors - YoY Change of 3 Month Rolling Average',
-        data_source="geopandas", month=editor_last_month
-    )
-    chart.plot_wcolorbar(col='ed_3morolling_yoy')
-    chart.plot_regions(region_table,'ed_3morolling_yoy_label')
-    chart.format_map(cbar_perc=True)
-    save_file_name = "Map_EditorsYoy.png"
-    chart.finalize_plot(save_file_name, display=True)
-
-    #---CONTENT METRICS - COUNT---
-    chart = Wikimap(
-        map_df, fignum=10, title = 'Quality Articles 2023',
-        data_source="geopandas", month=content_last_month
-    )
-    chart.plot_wcolorbar(col = 'standard_quality_count')
-    chart.plot_regions(region_table, 'sqc_label')
-    chart.format_map()
-    save_file_name = "Map_Content23.png"
-    chart.finalize_plot(save_file_name, display=True)
-
-    #---CONTENT METRICS - PERCENT TOTAL 2023---
-    chart = Wikimap(
-        map_df, fignum=12, title ='Quality Articles - Percent of Total 2023',
-        data_source="geopandas", month=content_last_month
-    )
-    chart.plot_wcolorbar(col = 'sqc_perc')
-    chart.plot_regions(region_table,'sqc_perc_label')
-    chart.format_map(cbar_perc=True)
-    save_file_name = "Map_ContentPerc23.png"
-    chart.finalize_plot(save_file_name,display=True)
-    
-    #---CONTENT METRICS - YOY of 3MO ROLLING Average---
-    chart = Wikimap(
-        map_df, fignum=13, title='Quality Articles - YoY',
-        data_source="geopandas", month=content_last_month
-    )
-    chart.plot_wcolorbar(col='sqc_yoy')
-    chart.plot_regions(region_table, 'sqc_yoy_label')
-    chart.format_map(cbar_perc=True)
-    save_file_name = "Map_ContentYoY.png"
-    chart.finalize_plot(save_file_name, display=True)
+    #---MAKE CHARTS---
+    # Each map colors countries by "col" (no coloring if None) and labels regions with "label_col"
+    map_specs = [
+        {"save_file_name": "Map_RegionNames.png", "title": "WMF Regions", "month": current_month,
+         "col": None, "label_col": "region", "display_month": False, "fontsize": 10},
+        {"save_file_name": "Map_WorldPop.png", "title": "World Population", "month": current_month,
+         "col": "sum_pop_est", "label_col": "pop_label"},
+        {"save_file_name": "Map_WorldPopPerc.png", "title": "World Population - Percent of Total", "month": current_month,
+         "col": "pop_perc", "label_col": "pop_perc_label", "cbar_perc": True},
+        {"save_file_name": "Map_UniqueDevices.png", "title": "Unique Devices", "month": reader_last_month,
+         "col": "unique_devices", "label_col": "ud_label"},
+        {"save_file_name": "Map_UniqueDevicesPerc.png", "title": "Unique Devices - Percent of Total", "month": reader_last_month,
+         "col": "ud_perc", "label_col": "ud_perc_label", "cbar_perc": True},
+        {"save_file_name": "Map_UniqueDevicesYoy.png", "title": "Unique Devices - YoY of 3 Month Rolling Average", "month": reader_last_month,
+         "col": "ud_3morolling_yoy", "label_col": "ud_3morolling_yoy_label", "cbar_perc": True},
+        {"save_file_name": "Map_Editors.png", "title": "Active Editors", "month": editor_last_month,
+         "col": "active_editors", "label_col": "ed_label"},
+        {"save_file_name": "Map_EditorsPerc.png", "title": "Active Editors - Percent of Total", "month": editor_last_month,
+         "col": "ed_perc", "label_col": "ed_perc_label", "cbar_perc": True},
+        {"save_file_name": "Map_EditorsYoy.png", "title": "Active Monthly Editors - YoY Change of 3 Month Rolling Average", "month": editor_last_month,
+         "col": "ed_3morolling_yoy", "label_col": "ed_3morolling_yoy_label", "cbar_perc": True},
+        {"save_file_name": "Map_Content23.png", "title": "Quality Articles 2023", "month": content_last_month,
+         "col": "standard_quality_count", "label_col": "sqc_label"},
+        {"save_file_name": "Map_ContentPerc23.png", "title": "Quality Articles - Percent of Total 2023", "month": content_last_month,
+         "col": "sqc_perc", "label_col": "sqc_perc_label", "cbar_perc": True},
+        {"save_file_name": "Map_ContentYoY.png", "title": "Quality Articles - YoY", "month": content_last_month,
+         "col": "sqc_yoy", "label_col": "sqc_yoy_label", "cbar_perc": True}
+    ]
+
+    # Maps with a color bar share one figure: the countries, region outlines and labels are
+    # drawn once and only re-colored/re-labelled for each map
+    base_map = None
+    for fignum, spec in enumerate(map_specs):
+        col = spec["col"]
+        label_col = spec["label_col"]
+        cache_key = render_key(
+            map_df[["name", col]] if col else map_df[["name"]],
+            region_table[[label_col, "centroid"]],
+            script=__file__,
+            # Country and region geometry, which the frames above only cover by name
+            region_layer=region_layer_digest,
+            **spec
+        )
+        if is_fresh(spec["save_file_name"], cache_key):
+            continue
+
+        if col is None:
+            with Wikimap(
+                map_df, fignum=fignum, title=spec["title"],
+                data_source="geopandas", month=spec["month"],
+                display_month=spec.get("display_month", True)
+            ) as chart:
+                chart.plot_regions(region_table, label_col, fontsize=spec.get("fontsize", 12))
+                chart.format_map(format_colobar=False)
+                chart.finalize_plot(spec["save_file_name"], display=True, cache_key=cache_key)
+            continue
+
+        if base_map is None:
+            base_map = Wikimap(map_df, fignum=fignum, data_source="geopandas")
+            base_map.plot_base()
+            base_map.plot_regions(region_table, label_col)
+        base_map.set_title(spec["title"], month=spec["month"], display_month=spec.get("display_month", True))
+        base_map.color_countries(col)
+        base_map.set_region_labels(region_table, label_col)
+        base_map.format_map(cbar_perc=spec.get("cbar_perc", False))
+        base_map.finalize_plot(spec["save_file_name"], display=True, cache_key=cache_key, close=False)
+
+    if base_map is not None:
+        base_map.close()
 
 if __name__ == "__main__":
     main()
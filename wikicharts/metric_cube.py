@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from .config import wmf_region_keys
+
+
+def suffix_parser(metric, dimension_names=None):
+    """Returns a column parser for columns named "<dimension>_<metric>", e.g. "south_asia_unique_devices".
+
+    dimension_names maps the dimension as written in column names to its display name.
+    """
+    suffix = "_" + metric
+
+    def parse(column):
+        if not column.endswith(suffix):
+            return None
+        dimension = column[:-len(suffix)]
+        if dimension_names is not None:
+            dimension = dimension_names.get(dimension, dimension)
+        return metric, dimension
+
+    return parse
+
+
+def prefix_parser(prefix, metric=None, dimension_names=None):
+    """Returns a column parser for columns named "<prefix><dimension>", e.g. "total_quality_articles_about_South Asia".
+
+    The metric name defaults to the prefix without a trailing "_about_" or "_".
+    """
+    if metric is None:
+        metric = prefix.removesuffix("_about_").rstrip("_")
+
+    def parse(column):
+        if not column.startswith(prefix):
+            return None
+        dimension = column[len(prefix):]
+        if dimension_names is not None:
+            dimension = dimension_names.get(dimension, dimension)
+        return metric, dimension
+
+    return parse
+
+
+# Parses regional columns like "south_asia_unique_devices" into WMF region names
+regional_unique_devices_parser = suffix_parser("unique_devices", wmf_region_keys)
+
+
+def dimension_columns(columns, metric, *parsers):
+    """Returns {column: dimension value} for the columns which the parsers map to metric.
+
+    E.g. to use a file's derivatives (see Derivatives.view) with the column names
+    MetricCube.slice gives the metric's wide frame.
+    """
+    dimensions = {}
+    for column in columns:
+        for parse in parsers:
+            key = parse(column)
+            if key is not None:
+                if key[0] == metric:
+                    dimensions[column] = key[1]
+                break
+
+    return dimensions
+
+
+class MetricCube():
+    """Monthly metrics broken down by a dimension (region, gender, project, country...) in long format.
+
+    Values are held in a single Series indexed by (metric, dimension, month), so adding a
+    dimension value or a metric doesn't need new column names, and a metric can be sliced
+    out as the wide frame (one column per dimension value) chart code expects.
+    """
+    def __init__(self, values):
+        """Takes a Series with a (metric, dimension, month) MultiIndex."""
+        self.values = values.sort_index()
+
+    @classmethod
+    def from_wide(cls, df, *parsers):
+        """Builds a cube from a wide frame indexed by month, with one column per metric and dimension value.
+
+        Each parser maps a column name to (metric, dimension), or None if it doesn't apply;
+        columns no parser applies to are left out.
+        """
+        columns = {}
+        for column in df.columns:
+            for parse in parsers:
+                key = parse(column)
+                if key is not None:
+                    columns[column] = key
+                    break
+
+        # Lay the columns out end to end, so each run of months is one (metric, dimension)
+        keys = list(columns.values())
+        num_months = len(df.index)
+        index = pd.MultiIndex.from_arrays(
+            [
+                pd.Index([metric for metric, _ in keys], dtype=object).repeat(num_months),
+                pd.Index([dimension for _, dimension in keys], dtype=object).repeat(num_months),
+                df.index.take(np.tile(np.arange(num_months), len(keys)))
+            ],
+            names=["metric", "dimension", "month"]
+        )
+        values = pd.Series(df[list(columns)].to_numpy(dtype=float).T.ravel(), index=index).dropna()
+        return cls(values)
+
+    def metrics(self):
+        """Returns the names of the metrics in the cube."""
+        return self.values.index.get_level_values("metric").unique().tolist()
+
+    def dimensions(self, metric):
+        """Returns the dimension values a metric is broken down by."""
+        return self.values.xs(metric, level="metric").index.get_level_values("dimension").unique().tolist()
+
+    def slice(self, metric, dimensions=None, start=None, end=None):
+        """Returns one metric as a wide frame indexed by month, with a column per dimension value.
+
+        Columns follow the order of dimensions if given. start and end (inclusive) limit the months.
+        """
+        wide = self.values.xs(metric, level="metric").unstack("dimension")
+        wide.columns.name = None
+        if start is not None or end is not None:
+            wide = wide.loc[start:end]
+        if dimensions is not None:
+            wide = wide.reindex(columns=dimensions)
+        return wide
+
+    def long(self, metric, dimension_name="dimension"):
+        """Returns one metric as a long frame with "month", dimension_name and metric columns."""
+        return (
+            self.values
+            .xs(metric, level="metric")
+            .rename(metric)
+            .rename_axis([dimension_name, "month"])
+            .reset_index()
+            .sort_values(["month", dimension_name], kind="stable")
+            [["month", dimension_name, metric]]
+            .reset_index(drop=True)
+        )
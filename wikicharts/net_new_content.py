@@ -1,5 +1,7 @@
 from .wikicharts import Wikichart
+from .render_cache import render_key, is_fresh
 import pandas as pd
+from . import datasets
 from .config import wmf_colors
 from datetime import datetime
 
@@ -16,12 +18,10 @@ def main():
     display_flag = True
 
     #---CLEAN DATA--
-    df = pd.read_csv(editing_data_path, sep='\t')
-        
     start_date = "2018-05-01"
     end_date = datetime.today()
-    df['month'] = pd.to_datetime(df['month'])
-    df = df[df["month"].isin(pd.date_range(start_date, end_date))]
+    df = datasets.load_range(editing_data_path, start_date, end_date,
+                             columns=['net_new_Commons_content_pages', 'net_new_Wikidata_entities', 'net_new_Wikipedia_articles'])
 
     #---PREPARE TO PLOT
     key = pd.DataFrame([['Commons',wmf_colors['pink']],
@@ -30,8 +30,12 @@ def main():
         index=['net_new_Commons_content_pages','net_new_Wikidata_entities','net_new_Wikipedia_articles'],
         columns=['labelname','color'])
 
+    cache_key = render_key(df, script=__file__)
+    if is_fresh(save_file_name, cache_key):
+        return
+
     #---MAKE CHART---
-    chart = Wikichart(start_date,end_date,df)
+    chart = Wikichart(start_date,end_date,df,derivatives=datasets.derivatives(editing_data_path))
     chart.init_plot(width=12)
     chart.plot_line('month',
                     'net_new_Commons_content_pages',
@@ -70,7 +74,7 @@ def main():
                               key,chart.calc_yoy, 
                               xpad=0)
 
-    chart.finalize_plot(save_file_name,display=display_flag)
+    chart.finalize_plot(save_file_name, display=display_flag, cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
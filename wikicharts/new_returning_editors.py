@@ -1,5 +1,6 @@
 from .wikicharts import Wikichart
-import pandas as pd
+from .render_cache import render_key, is_fresh
+from . import datasets
 from .config import wmf_colors
 from datetime import datetime
 from .parameters import editing_data_path
@@ -13,53 +14,55 @@ def main():
     display_flag = True
 
     #---CLEAN DATA---
-    df = pd.read_csv(editing_data_path, sep='\t')
- 
     start_date = "2019-01-01"
     end_date = datetime.today()
-    df['month'] = pd.to_datetime(df['month'])
-    df = df[df["month"].isin(pd.date_range(start_date, end_date))]
+    df = datasets.load_range(editing_data_path, start_date, end_date,
+                             columns=['returning_active_editors', 'new_active_editors'])
 
     colors = {'Returning': wmf_colors['blue'], 
               'New': wmf_colors['green50']}
 
     #---MAKE CHART FOR RETURNING EDITORS---
-    chart = Wikichart(start_date, end_date, df)
-    chart.init_plot(width=12)
-    chart.plot_line('month', 'returning_active_editors', colors['Returning'])
-    chart.plot_monthlyscatter('month', 'returning_active_editors', colors['Returning'])
-    chart.plot_yoy_highlight('month', 'returning_active_editors')
-    chart.format(title='Returning Active Editors',
-                 radjust=0.75,
-                 data_source="https://github.com/wikimedia-research/Editing-movement-metrics")
+    cache_key = render_key(df, script=__file__, chart='returning')
+    if not is_fresh(returning_editors_filename, cache_key):
+        chart = Wikichart(start_date, end_date, df, derivatives=datasets.derivatives(editing_data_path))
+        chart.init_plot(width=12)
+        chart.plot_line('month', 'returning_active_editors', colors['Returning'])
+        chart.plot_monthlyscatter('month', 'returning_active_editors', colors['Returning'])
+        chart.plot_yoy_highlight('month', 'returning_active_editors')
+        chart.format(title='Returning Active Editors',
+                     radjust=0.75,
+                     data_source="https://github.com/wikimedia-research/Editing-movement-metrics")
     
-    chart.plot_yoy_highlight('month','returning_active_editors')
-    chart.annotate(x='month',
-        y='returning_active_editors',
-        num_annotation=chart.calc_yoy(y='returning_active_editors'))
+        chart.plot_yoy_highlight('month','returning_active_editors')
+        chart.annotate(x='month',
+            y='returning_active_editors',
+            num_annotation=chart.calc_yoy(y='returning_active_editors'))
 
     
-    chart.finalize_plot(returning_editors_filename, display=display_flag)
+        chart.finalize_plot(returning_editors_filename, display=display_flag, cache_key=cache_key)
 
     #---MAKE CHART FOR NEW EDITORS---
-    chart = Wikichart(start_date, end_date, df)
+    cache_key = render_key(df, script=__file__, chart='new')
+    if not is_fresh(new_editors_filename, cache_key):
+        chart = Wikichart(start_date, end_date, df, derivatives=datasets.derivatives(editing_data_path))
     
-    chart.init_plot(width=12)
-    chart.plot_line('month', 'new_active_editors', colors['New'])
-    chart.plot_monthlyscatter('month', 'new_active_editors', colors['New'])
-    chart.plot_yoy_highlight('month', 'new_active_editors')
+        chart.init_plot(width=12)
+        chart.plot_line('month', 'new_active_editors', colors['New'])
+        chart.plot_monthlyscatter('month', 'new_active_editors', colors['New'])
+        chart.plot_yoy_highlight('month', 'new_active_editors')
     
-    chart.format(title='New Active Editors',
-                 radjust=0.75,
-                 data_source="https://github.com/wikimedia-research/Editing-movement-metrics")
+        chart.format(title='New Active Editors',
+                     radjust=0.75,
+                     data_source="https://github.com/wikimedia-research/Editing-movement-metrics")
     
-    chart.plot_yoy_highlight('month','new_active_editors')
+        chart.plot_yoy_highlight('month','new_active_editors')
     
-    chart.annotate(x='month',
-        y='new_active_editors',
-        num_annotation=chart.calc_yoy(y='new_active_editors'))
+        chart.annotate(x='month',
+            y='new_active_editors',
+            num_annotation=chart.calc_yoy(y='new_active_editors'))
     
-    chart.finalize_plot(new_editors_filename, display=display_flag)
+        chart.finalize_plot(new_editors_filename, display=display_flag, cache_key=cache_key)
     
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+from .parameters import save_directory
+
+# Paths of every chart image saved by this process, in the order they were written.
+# The batch renderer clears this before each job so it can report per-job outputs.
+saved_files = []
+
+# Paths of chart images that were already up to date and left untouched
+cached_files = []
+
+
+def output_path(save_file_name):
+    """Returns the path a chart with the given file name is saved to."""
+    return save_directory + save_file_name
+
+
+def record_output(save_path):
+    """Records that a chart image has been written to save_path."""
+    saved_files.append(save_path)
+
+
+def record_cached(save_path):
+    """Records that an existing chart image at save_path was kept instead of re-rendered."""
+    cached_files.append(save_path)
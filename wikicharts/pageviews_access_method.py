@@ -1,11 +1,12 @@
 from .wikicharts import Wikichart
-import matplotlib.pyplot as plt
-import pandas as pd
+from .render_cache import render_key, is_fresh
+from . import datasets
 from .config import wmf_colors
 from datetime import datetime
 
 
 from .parameters import readers_data_path
+from .data_utils import as_float_columns
 
 def main():
     print("Generating Pageviews Access Method chart...")
@@ -15,42 +16,42 @@ def main():
     save_file_name = "Pageviews_Access_Method.png"
 
     #---CLEAN DATA--
-    df = pd.read_csv(readers_data_path, sep='\t')
-    
-    df = df[['month','desktop', 'mobileweb']]
-    df = df.rename(columns={'mobileweb':'mobile_web', 'month':'timestamp'})
-    
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
     start_date = "2022-02-01"
     end_date = datetime.today()
     
-    df.sort_values(by='timestamp')
-    df = df[df["timestamp"].isin(pd.date_range(start_date, end_date))]
+    # Plotted directly with matplotlib below, so as plain floats
+    df = as_float_columns(datasets.load_range(readers_data_path, start_date, end_date, columns=['desktop', 'mobileweb']))
+    df = df.rename(columns={'mobileweb':'mobile_web', 'month':'timestamp'})
     
 
+    cache_key = render_key(df, script=__file__)
+    if is_fresh(save_file_name, cache_key):
+        return
+
     #---PLOT---
     
     chart = Wikichart(start_date,end_date,df,time_col='timestamp')
     chart.init_plot()
+    ax = chart.gca()
     
-    plt.plot(df.timestamp, 
-             df.desktop,label='_nolegend_',
-             color=wmf_colors['brightgreen'])
+    ax.plot(df.timestamp, 
+            df.desktop,label='_nolegend_',
+            color=wmf_colors['brightgreen'])
     
-    plt.plot(df.timestamp, 
-             df.mobile_web,
-             label='_nolegend_',
-             color=wmf_colors['pink'])
+    ax.plot(df.timestamp, 
+            df.mobile_web,
+            label='_nolegend_',
+            color=wmf_colors['pink'])
     
-    plt.scatter(df.timestamp, 
-                df.desktop,
-                label='_nolegend_',
-                color=wmf_colors['brightgreen'])
+    ax.scatter(df.timestamp, 
+               df.desktop,
+               label='_nolegend_',
+               color=wmf_colors['brightgreen'])
     
-    plt.scatter(df.timestamp, 
-                df.mobile_web,
-                label='_nolegend_',
-                color=wmf_colors['pink'])
+    ax.scatter(df.timestamp, 
+               df.mobile_web,
+               label='_nolegend_',
+               color=wmf_colors['pink'])
     
     chart.format(title = f'Pageviews by Access Method',
         radjust=0.85,
@@ -58,8 +59,8 @@ def main():
         ladjust=0.1,
         data_source="https://docs.google.com/spreadsheets/d/1Aw5kjj47cEi-PSX0eApCUp3Ww9_XNyARxcdoL9QnHp4")
     
-    plt.xlabel("",font='Montserrat', fontsize=18, labelpad=10)
-    plt.ylabel("Pageviews",font='Montserrat', fontsize=18,labelpad=10)
+    ax.set_xlabel("",font='Montserrat', fontsize=18, labelpad=10)
+    ax.set_ylabel("Pageviews",font='Montserrat', fontsize=18,labelpad=10)
     
     chart.annotate(x='timestamp',
         y='desktop',
@@ -76,7 +77,8 @@ def main():
                                              yoy_note=''))
     
     chart.finalize_plot(save_file_name,
-                        display=True)
+                        display=True,
+                        cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,8 +1,11 @@
 from .wikicharts import Wikichart
+from .render_cache import render_key, is_fresh
 import pandas as pd
+from . import datasets
 from .config import wmf_colors
 from datetime import datetime
 from .parameters import readers_data_path
+from .data_utils import as_float_columns
 import numpy as np
 
 
@@ -15,19 +18,17 @@ def main():
     display_flag = True
 
     #---CLEAN DATA--
-    df = pd.read_csv(readers_data_path, sep='\t')
- 
-    corrected_df = pd.read_csv('wikicharts/resources/data/corrected_metrics_only.csv', 
-                               sep=',')
     start_date = "2018-05-01"
     end_date = datetime.today()
     
-    df['month'] = pd.to_datetime(df['month'])
-    
+    corrected_df = pd.read_csv('wikicharts/resources/data/corrected_metrics_only.csv', 
+                               sep=',')
     corrected_df['month'] = pd.to_datetime(corrected_df['month'])
     corrected_df.set_index('month')
     
-    df = df[df["month"].isin(pd.date_range(start_date, end_date))]
+    # Corrected values are written into these columns below, so they are loaded as plain floats
+    df = as_float_columns(datasets.load_range(readers_data_path, start_date, end_date,
+                                              columns=['interactions', 'automated_pageviews', 'total_pageview']))
     
     # Rename columns to match with main metric columns
     df['interactions_corrected'] = df['interactions']
@@ -51,6 +52,10 @@ def main():
     corrected_df['total_pageview'] = corrected_df['total_pageview'] - corrected_df['automated_pageviews']
 
     
+    cache_key = render_key(df, corrected_df, script=__file__)
+    if is_fresh(save_file_name, cache_key):
+        return
+
     #---MAKE CHART---
     chart = Wikichart(start_date,end_date,df)
     chart.init_plot()
@@ -80,7 +85,8 @@ def main():
                              annotation_fxn=chart.calc_yoy, 
                              xpad = 1)
     chart.finalize_plot(save_file_name,
-                        display=display_flag)
+                        display=display_flag,
+                        cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
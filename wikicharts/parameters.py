@@ -5,3 +5,6 @@ content_gap_data_path = "metrics/content_gap_data_metrics.tsv"
 save_directory = "charts/"
 author = "Movement Insights"
 content_gap_data_path = "metrics/content_gap_data_metrics.tsv"
+render_cache_directory = "charts/.render_cache/"
+use_render_cache = True
+region_geometry_path = "wikicharts/resources/cache/region_geometry.pkl"
@@ -1,5 +1,6 @@
 from datetime import date, datetime, timedelta
 from .wikicharts import Wikichart
+from .render_cache import render_key, is_fresh
 from .config import wmf_colors
 import pandas as pd
 
@@ -58,6 +59,10 @@ def main():
         index=['wikidata','wikipedia','commons'],
         columns=['labelname','color'])
 
+    cache_key = render_key(df, script=__file__)
+    if is_fresh('growth_chart.png', cache_key):
+        return
+
     #---PLOT---
     chart = Wikichart(start_date,end_date,df)
     chart.init_plot(width=12)
@@ -68,7 +73,7 @@ def main():
         radjust=0.75,
         data_source="https://stats.wikimedia.org")
     chart.multi_yoy_annotate(['wikidata','wikipedia','commons'],key,chart.calc_finalcount,xpad=0)
-    chart.finalize_plot('growth_chart.png',display=display_flag)
+    chart.finalize_plot('growth_chart.png', display=display_flag, cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
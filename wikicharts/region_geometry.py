@@ -0,0 +1,161 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import wmf_regions
+from .data_utils import adjust_label_position
+from .parameters import region_geometry_path
+
+# Bump when the contents of the stored layer change, to force a rebuild
+LAYER_VERSION = 1
+
+# Manual label position adjustments (very complicated to do programmatically in matplotlib and not necessary)
+LABEL_ADJUSTMENTS = {
+    'Middle East & North Africa': {'y': 3},
+    'South Asia': {'y': -3},
+    'Northern & Western Europe': {'x': 15, 'y': -18},
+    'Central & Eastern Europe & Central Asia': {'y': 2}
+}
+
+
+def fetch_country_regions():
+    """Queries the country to WMF region mapping from canonical_data.countries."""
+    import wmfdata as wmf
+    return wmf.presto.run("""
+        SELECT
+            name,
+            iso_alpha3_code,
+            wikimedia_region AS region
+        FROM canonical_data.countries
+    """)
+
+
+def _shapefile_digest(shapefile):
+    """Hashes a shapefile together with its sidecar files (.dbf, .shx, .prj, ...)."""
+    h = hashlib.sha256()
+    shapefile = Path(shapefile)
+    for path in sorted(shapefile.parent.glob(shapefile.stem + ".*")):
+        h.update(path.name.encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _mapping_digest(country_regions):
+    mapping = (
+        country_regions[['iso_alpha3_code', 'region']]
+        .sort_values('iso_alpha3_code')
+        .reset_index(drop=True)
+    )
+    return hashlib.sha256(pd.util.hash_pandas_object(mapping).values.tobytes()).hexdigest()
+
+
+def build_region_layer(country_regions, shapefile):
+    """Builds the country and WMF region geometry used by the maps.
+
+    Returns map_df, with one row per country (excluding Antarctica) and its region, and
+    region_table, indexed by region, with the total population estimate, the dissolved
+    region polygon, its boundary and the (adjusted) position of the region label.
+    """
+    # Only imported when the layer is (re)built, so that importing the maps is cheap
+    import geopandas as gpd
+    from shapely.ops import unary_union
+    raw_map_df = gpd.read_file(shapefile)
+    map_df = raw_map_df[(raw_map_df.name != "Antarctica")]
+
+    # match up wmf region data in country_regions with geographic data in map_df
+    map_df = map_df.merge(country_regions, how='left', left_on="iso_a3", right_on="iso_alpha3_code")
+    map_df = map_df[['name_x', 'iso_a3', 'pop_est', 'gdp_md_est', 'geometry', 'region']]
+    map_df = map_df.rename(columns={"name_x": "name"})
+
+    region_table = pd.pivot_table(
+        map_df,
+        values='pop_est',
+        index=['region'],
+        aggfunc=np.sum
+    )
+    region_table = region_table.rename(columns={'pop_est': 'sum_pop_est'})
+
+    # Dissolve country polygons into regions
+    region_table['geometry'] = None
+    for region in wmf_regions:
+        region_polys = map_df.loc[map_df['region'] == region, 'geometry'].values.tolist()
+        region_table.at[region, 'geometry'] = unary_union(region_polys)
+
+    # Get just the boundary linestrings (otherwise geoseries.plot has facecolor bug)
+    region_table['boundary'] = region_table['geometry'].apply(lambda g: g.boundary if g is not None else None)
+
+    # Get representative centroid xys for each region
+    region_table['centroid'] = region_table['geometry'].apply(lambda g: g.centroid if g is not None else None)
+    for region, offsets in LABEL_ADJUSTMENTS.items():
+        adjust_label_position(region, region_table=region_table, **offsets)
+
+    return map_df, region_table
+
+
+def _read_layer(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _write_layer(layer, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename, so a half-written layer is never read back
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(layer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_region_layer(country_regions=None, refresh=False, path=region_geometry_path):
+    """Returns (map_df, region_table) as built by build_region_layer, from disk if possible, and a digest of the layer.
+
+    The stored layer is rebuilt when the Natural Earth shapefile changes, when a
+    country_regions mapping different from the stored one is passed, or when refresh is
+    True (which also re-queries the mapping). Otherwise no query is made, so maps can be
+    drawn offline once the layer has been built.
+
+    The digest identifies the shapefile and mapping the layer was built from, e.g. for
+    render_key, so maps are re-rendered when the country or region geometry changes.
+    """
+    import geopandas as gpd
+    shapefile = gpd.datasets.get_path('naturalearth_lowres')
+    shapefile_digest = _shapefile_digest(shapefile)
+
+    layer = None if refresh else _read_layer(path)
+    if layer is not None and layer['version'] != LAYER_VERSION:
+        layer = None
+
+    if country_regions is None:
+        if layer is not None:
+            country_regions = layer['country_regions']
+        else:
+            country_regions = fetch_country_regions()
+    mapping_digest = _mapping_digest(country_regions)
+    layer_digest = hashlib.sha256(
+        f"{LAYER_VERSION}:{shapefile_digest}:{mapping_digest}".encode()
+    ).hexdigest()
+
+    if (
+        layer is not None
+        and layer['shapefile_digest'] == shapefile_digest
+        and layer['mapping_digest'] == mapping_digest
+    ):
+        return layer['map_df'], layer['region_table'], layer_digest
+
+    map_df, region_table = build_region_layer(country_regions, shapefile)
+    _write_layer({
+        'version': LAYER_VERSION,
+        'shapefile_digest': shapefile_digest,
+        'mapping_digest': mapping_digest,
+        'country_regions': country_regions,
+        'map_df': map_df,
+        'region_table': region_table
+    }, path)
+    return map_df, region_table, layer_digest
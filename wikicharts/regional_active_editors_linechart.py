@@ -1,4 +1,5 @@
 from .wikicharts import Wikichart
+from .render_cache import render_key, all_fresh
 import pandas as pd
 from .config import wmf_colors, key_colors
 from datetime import datetime
@@ -37,29 +38,32 @@ def main():
     df = df[col_order]
     dfs = [df.reset_index()]
 
+    cache_key = render_key(df, script=__file__)
+    save_file_names = [save_file_name_base + "_" + 'All' + ".png"] + [
+        save_file_name_base + "_" + f'{col}' + ".png" for col in df.columns
+    ]
+    if all_fresh(save_file_names, cache_key):
+        return
+
     #---MAKE CHARTS---
     max_charts_per_figure = 8
-    fig_counter = 0
     
     
     keys = gen_keys(dfs, key_colors)
     total_num_charts = len(df.columns)
     num_figures = ceil(total_num_charts / max_charts_per_figure)
-    figures = [None] * num_figures
-    maxranges = [None] * num_figures
-    num_ticks = [None] * num_figures
     
    
+    # Figures are closed once saved, so only one is held in memory at a time
     for f in range(num_figures):
-        fig_counter += 1
         charts_in_figure = len(dfs[f].columns) - 1
-        figures[f] = Wikichart(start_date, end_date, dfs[f])
-        figures[f].init_plot(width=12, subplotsx=2, subplotsy=4, fignum=f)
-        figures[f].plot_subplots_lines('month', keys[f], num_charts=charts_in_figure, subplot_title_size=9)
-        figures[f].plot_multi_trendlines('month', keys[f], num_charts=charts_in_figure)
+        figure = Wikichart(start_date, end_date, dfs[f])
+        figure.init_plot(width=12, subplotsx=2, subplotsy=4, fignum=f)
+        figure.plot_subplots_lines('month', keys[f], num_charts=charts_in_figure, subplot_title_size=9)
+        figure.plot_multi_trendlines('month', keys[f], num_charts=charts_in_figure)
 
         # Set individual y-axis limits and labels for each subplot
-        for i, ax in enumerate(figures[f].ax.flat):
+        for i, ax in enumerate(figure.ax.flat):
             if i < charts_in_figure:
                 region_label = keys[f].iloc[i]['labelname']
                 region_data = dfs[f][region_label].dropna()
@@ -74,21 +78,20 @@ def main():
                 ax.set_yticks(y_ticks)
                 ax.set_yticklabels(y_labels)
 
-        figures[f].format_subplots(title='Regional Active Editors',
-                                   key=keys[f],
-                                   data_source="https://docs.google.com/spreadsheets/d/13XrrnCaz9qsKs5Gu_lUs2jtsK9VrSiGlilCleDgR6KM",
-                                   num_charts=charts_in_figure,
-                                   tickfontsize=8)
-        figures[f].clean_ylabels_subplots(tickfontsize=8)
+        figure.format_subplots(title='Regional Active Editors',
+                               key=keys[f],
+                               data_source="https://docs.google.com/spreadsheets/d/13XrrnCaz9qsKs5Gu_lUs2jtsK9VrSiGlilCleDgR6KM",
+                               num_charts=charts_in_figure,
+                               tickfontsize=8)
+        figure.clean_ylabels_subplots(tickfontsize=8)
         save_file_name = save_file_name_base + "_" + 'All' + ".png"
-        figures[f].finalize_plot(save_file_name, display=False)
+        figure.finalize_plot(save_file_name, display=False, cache_key=cache_key)
         
     #---GENERATE INDIVIDUAL CHARTS---
     df.reset_index(inplace=True)
 
     df['month'] = pd.to_datetime(df['month'])
 
-    individual_charts = []
     columns = list(df.columns)
 
     for current_col in columns:
@@ -98,30 +101,29 @@ def main():
             
             current_df = current_df.sort_values(by='month').drop_duplicates(subset='month', keep='last')
             
-            chart = Wikichart(start_date, end_date, current_df)
-            chart.init_plot(fignum=len(individual_charts) + 1)
-            current_color = key_colors[(columns.index(current_col) % len(key_colors))]
+            with Wikichart(start_date, end_date, current_df) as chart:
+                chart.init_plot(fignum=num_figures)
+                current_color = key_colors[(columns.index(current_col) % len(key_colors))]
             
-            chart.plot_line('month', current_col, col=current_color)
-            chart.plot_monthlyscatter('month', current_col, col=current_color)
-            chart.plot_yoy_highlight('month', current_col, highlight_radius = 700)
+                chart.plot_line('month', current_col, col=current_color)
+                chart.plot_monthlyscatter('month', current_col, col=current_color)
+                chart.plot_yoy_highlight('month', current_col, highlight_radius = 700)
             
-            chart.format(
-                title=f'Active Editors: {current_col}',
-                ybuffer=False,
-                data_source="https://docs.google.com/spreadsheets/d/13XrrnCaz9qsKs5Gu_lUs2jtsK9VrSiGlilCleDgR6KM",
-                tadjust=0.825, badjust=0.125,
-                titlepad=25
-            )
+                chart.format(
+                    title=f'Active Editors: {current_col}',
+                    ybuffer=False,
+                    data_source="https://docs.google.com/spreadsheets/d/13XrrnCaz9qsKs5Gu_lUs2jtsK9VrSiGlilCleDgR6KM",
+                    tadjust=0.825, badjust=0.125,
+                    titlepad=25
+                )
             
-            chart.annotate(
-                x='month',
-                y=current_col,
-                num_annotation=chart.calc_yoy(y=current_col, yoy_note="")
-            )
+                chart.annotate(
+                    x='month',
+                    y=current_col,
+                    num_annotation=chart.calc_yoy(y=current_col, yoy_note="")
+                )
             
-            chart.finalize_plot(current_savefile, display=False)
-            individual_charts.append(chart)
+                chart.finalize_plot(current_savefile, display=False, cache_key=cache_key)
 
 
 
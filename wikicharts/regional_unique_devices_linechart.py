@@ -1,13 +1,15 @@
 from .wikicharts import Wikichart
-import pandas as pd
+from .render_cache import render_key, all_fresh
+from . import datasets
 from .config import key_colors, wmf_regions
 from datetime import datetime
-import matplotlib.pyplot as plt
 from .parameters import unique_devices_data_path
 
 import warnings
 from math import ceil
 from .data_utils import gen_keys
+from .metric_cube import MetricCube, regional_unique_devices_parser, dimension_columns
+from .yrange import tick_bins, plan_subplot_yranges, plan_yrange, widest_tick_range, standardized_limits
 
 
 def main():
@@ -19,33 +21,22 @@ def main():
     save_file_name_base = "Regional_Unique_Devices"
 
     #---CLEAN DATA---
-    df = pd.read_csv(unique_devices_data_path, sep='\t')
-    
     start_date = "2018-03-01"
     end_date = datetime.today()
     
     block_off_start = datetime.strptime("2021-01-01", '%Y-%m-%d')
     block_off_end = datetime.strptime("2022-07-01", '%Y-%m-%d')
     
-    df['month'] = pd.to_datetime(df['month'])
-    df = df[df["month"].isin(pd.date_range(start_date, end_date))]
+    df = datasets.load_range(unique_devices_data_path, start_date, end_date)
     
-    # Rename columns to nicely-formatted region names
-    column_names_to_region_names = {
-        'central_eastern_europe_central_asia_unique_devices': 'Central & Eastern Europe & Central Asia',
-        'east_southeast_asia_pacific_unique_devices': 'East, Southeast Asia, & Pacific',
-        'latin_america_caribbean_unique_devices': 'Latin America & Caribbean',
-        'middle_east_north_africa_unique_devices': 'Middle East & North Africa',
-        'north_america_unique_devices': 'North America',
-        'northern_western_europe_unique_devices': 'Northern & Western Europe',
-        'south_asia_unique_devices': 'South Asia',
-        'subsaharan_africa_unique_devices': 'Sub-Saharan Africa',
-        'unclassed_unique_devices': 'Unclassed',
-        'unknown_unique_devices': 'Unknown'
-    }
+    # The file's derivatives, shared with the maps, with the region names used below
+    file_derivatives = datasets.derivatives(unique_devices_data_path)
+    derivatives = file_derivatives.view(
+        columns=dimension_columns(file_derivatives.values.columns, 'unique_devices', regional_unique_devices_parser)
+    )
     
-    df = df.rename(column_names_to_region_names, axis='columns')
-    df = df.set_index('month')
+    # One column per region, named with nicely-formatted region names
+    df = MetricCube.from_wide(df.set_index('month'), regional_unique_devices_parser).slice('unique_devices')
     
     columns_in_order = df.sum().sort_values(ascending=False).index
     
@@ -55,90 +46,96 @@ def main():
     dfs = [df[wmf_regions].reset_index(), df[df.columns[~df.columns.isin(wmf_regions)]].reset_index()]
     df = df.reset_index()
     
+    # All charts share a y-axis range, so they are only kept if none of the data changed
+    cache_key = render_key(df, script=__file__)
+    save_file_names = [save_file_name_base + "_All" + ".png"] + [
+        save_file_name_base + "_" + f'{col}' + ".png" for col in df.columns if col != 'month'
+    ]
+    if all_fresh(save_file_names, cache_key):
+        return
+    
     #---MAKE CHART---
     max_charts_per_figure = 8
     keys = gen_keys(dfs, key_colors)
     
     annotation_text = "     Data unreliable [February 2021 - June 2022] (period not shown)"
-    fig_counter = 0
     total_num_charts = len(df.columns) - 1
     num_figures = ceil(total_num_charts / max_charts_per_figure)
-    figures = [None]*num_figures
-    maxranges = [None]*num_figures 
-    num_ticks = [None]*num_figures
     
-    # Initialize each figure
-    for f in range(num_figures):
-        charts_in_figure = len(dfs[f].columns) - 1
-        figures[f] = Wikichart(start_date, end_date, dfs[f])
-        figures[f].init_plot(width=12, subplotsx=2, subplotsy=4, fignum=f)
-        figures[f].plot_subplots_lines('month', keys[f], num_charts=charts_in_figure, 
-                                       subplot_title_size=9)
-        figures[f].plot_multi_trendlines('month', keys[f], num_charts=charts_in_figure)
-        maxranges[f], num_ticks[f] = figures[f].get_maxyrange()
+    # Plan every subplot's y-range from the data, so that each figure is only plotted
+    # once, with the shared y-scale already applied
+    nbins = tick_bins(height=6, nrows=2)
+    yranges = [
+        plan_subplot_yranges(dfs[f], 'month', keys[f]['labelname'], nbins)
+        for f in range(num_figures)
+    ]
     
     # Calculate the largest range between the two figures and multiple subplots
-    maxrange = max(maxranges)
-    maxrange_index = maxranges.index(maxrange)
-    maxrange_numticks = num_ticks[maxrange_index]
+    maxrange, maxrange_numticks = widest_tick_range([r for figure_yranges in yranges for r in figure_yranges])
     
     # Plot regional linechart and save file
     for f in range(num_figures):
-        plt.figure(f)
         charts_in_figure = len(dfs[f].columns) - 1
-        figures[f].standardize_subplotyrange(maxrange, maxrange_numticks, num_charts=charts_in_figure)
-        figures[f].block_off_multi(block_off_start, block_off_end)
-        figures[f].add_block_legend()
-        figures[f].format_subplots(title='Regional Unique Devices', 
+        ylims = [standardized_limits(r.ymin, r.ymax, maxrange, maxrange_numticks) for r in yranges[f]]
+        with Wikichart(start_date, end_date, dfs[f]) as figure:
+            figure.init_plot(width=12, subplotsx=2, subplotsy=4, fignum=f)
+            figure.plot_subplots_lines('month', keys[f], num_charts=charts_in_figure, 
+                                       subplot_title_size=9)
+            figure.plot_multi_trendlines('month', keys[f], num_charts=charts_in_figure)
+            figure.set_subplot_ylims(ylims)
+            figure.block_off_multi(block_off_start, block_off_end)
+            figure.add_block_legend()
+            figure.format_subplots(title='Regional Unique Devices', 
                                    key=keys[f], 
                                    data_source="https://docs.google.com/spreadsheets/d/13XrrnCaz9qsKs5Gu_lUs2jtsK9VrSiGlilCleDgR6KM", 
                                    tadjust=0.8, badjust=0.1, 
                                    num_charts=charts_in_figure, 
                                    tickfontsize=8)
-        figures[f].clean_ylabels_subplots(tickfontsize=8)
-        figures[f].top_annotation(annotation_text=annotation_text)
-        save_file_name = save_file_name_base + "_All" + ".png"
-        figures[f].finalize_plot(save_file_name, display=False)
-        fig_counter += 1
+            figure.clean_ylabels_subplots(tickfontsize=8)
+            figure.top_annotation(annotation_text=annotation_text)
+            save_file_name = save_file_name_base + "_All" + ".png"
+            figure.finalize_plot(save_file_name, display=False, cache_key=cache_key)
         
     #---INDIVIDUAL CHARTS---    
-    individual_charts = [None]*total_num_charts
+    # Each chart is closed once saved, so memory stays flat however many series there are
     columns = list(df.columns)
     columns.remove('month')
+    single_nbins = tick_bins(height=6)
     
     for c in range(len(columns)):
         current_col = columns[c]
         current_df = df[['month', current_col]]
         current_savefile = save_file_name_base + "_" + f'{current_col}' + ".png"
-        individual_charts[c] = Wikichart(start_date,end_date,current_df)
-        individual_charts[c].init_plot(fignum=fig_counter)
-    
-        current_color = key_colors[(c % len(key_colors))]
-        individual_charts[c].plot_line('month',current_col,current_color)
-        individual_charts[c].plot_monthlyscatter('month',current_col,col =current_color)
-        individual_charts[c].plot_yoy_highlight('month',current_col)
-        current_yrange = individual_charts[c].get_ytickrange()
+        with Wikichart(start_date,end_date,current_df,derivatives=derivatives) as chart:
+            chart.init_plot(fignum=num_figures)
         
-        if current_yrange > (maxrange / 8):
-            individual_charts[c].standardize_yrange(maxrange, maxrange_numticks)
+            current_color = key_colors[(c % len(key_colors))]
+            chart.plot_line('month',current_col,current_color)
+            chart.plot_monthlyscatter('month',current_col,col =current_color)
+            chart.plot_yoy_highlight('month',current_col)
+            current_yrange = plan_yrange(chart.df[current_col], nbins=single_nbins)
             
-        individual_charts[c].block_off(block_off_start,block_off_end, 
-                                       rectangle_text="Data unreliable February 2021 - June 2022 (inclusive)")
-        
-        individual_charts[c].format(title = f'Unique Devices: {current_col}',
-            ybuffer=False,
-            data_source="https://docs.google.com/spreadsheets/d/13XrrnCaz9qsKs5Gu_lUs2jtsK9VrSiGlilCleDgR6KM",
-            tadjust=0.825,badjust=0.125,
-            titlepad=25)
-        
-        individual_charts[c].annotate(
-            x='month',
-            y=current_col,
-            num_annotation=individual_charts[c].calc_yoy(y=current_col,yoy_note='')
-        )
-        
-        individual_charts[c].finalize_plot(current_savefile,display=False)
-        fig_counter +=1
+            if current_yrange.tick_range > (maxrange / 8):
+                ylims = standardized_limits(current_yrange.ymin, current_yrange.ymax, maxrange, maxrange_numticks)
+                if ylims is not None:
+                    chart.gca().set_ylim(*ylims)
+                
+            chart.block_off(block_off_start,block_off_end, 
+                            rectangle_text="Data unreliable February 2021 - June 2022 (inclusive)")
+            
+            chart.format(title = f'Unique Devices: {current_col}',
+                ybuffer=False,
+                data_source="https://docs.google.com/spreadsheets/d/13XrrnCaz9qsKs5Gu_lUs2jtsK9VrSiGlilCleDgR6KM",
+                tadjust=0.825,badjust=0.125,
+                titlepad=25)
+            
+            chart.annotate(
+                x='month',
+                y=current_col,
+                num_annotation=chart.calc_yoy(y=current_col,yoy_note='')
+            )
+            
+            chart.finalize_plot(current_savefile, display=False, cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
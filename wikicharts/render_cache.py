@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from .batch import discover_jobs
+from .config import style_parameters, wmf_colors
+from .outputs import output_path, record_cached
+from .parameters import render_cache_directory, use_render_cache
+
+# Bump to invalidate every cached chart
+CACHE_VERSION = 1
+
+# Set to False (e.g. python -m wikicharts.batch --no-cache) to always re-render
+enabled = use_render_cache
+
+PACKAGE_DIR = Path(__file__).parent
+
+
+def _hash_frame(h, frame):
+    """Adds a DataFrame or Series (labels, dtypes and values) to a running hash."""
+    if isinstance(frame, pd.Series):
+        frame = frame.to_frame()
+    h.update(json.dumps([str(c) for c in frame.columns]).encode())
+    h.update(json.dumps([str(d) for d in frame.dtypes]).encode())
+    h.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+
+
+@lru_cache(maxsize=None)
+def _shared_code_digest():
+    """Returns a hash of the source of every module in the package except the chart scripts.
+
+    That is all the code charts are drawn with (drawing, formatting, layout, config...),
+    so changing any of it invalidates every chart, while changing one chart script only
+    invalidates its own charts (see render_key's script argument).
+    """
+    charts = set(discover_jobs())
+    h = hashlib.sha256()
+    for path in sorted(PACKAGE_DIR.glob("*.py")):
+        if path.stem not in charts:
+            h.update(path.name.encode())
+            h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def render_key(*frames, script=None, include_date=False, **params):
+    """Returns a key identifying everything a chart image is rendered from.
+
+    The key covers the (already sliced) input frames, the chart module's source (pass
+    script=__file__, which covers titles, colors and other literals), any extra params,
+    the rest of the package's code and the shared style config. The "Created by ... on
+    <date>" footer is left out unless include_date is True, so a chart is not re-rendered
+    just because the day has changed.
+    """
+    h = hashlib.sha256(f"wikicharts-render-v{CACHE_VERSION}".encode())
+    for frame in frames:
+        _hash_frame(h, frame)
+    h.update(_shared_code_digest().encode())
+    if script:
+        h.update(Path(script).read_bytes())
+    config = {
+        "params": params,
+        "style_parameters": style_parameters,
+        "wmf_colors": wmf_colors
+    }
+    if include_date:
+        config["date"] = date.today()
+    h.update(json.dumps(config, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _key_path(save_file_name):
+    return os.path.join(render_cache_directory, save_file_name + ".sha256")
+
+
+def _matches(save_file_name, key):
+    if not enabled or key is None:
+        return False
+    try:
+        with open(_key_path(save_file_name)) as f:
+            cached_key = f.read().strip()
+    except FileNotFoundError:
+        return False
+    return cached_key == key and os.path.exists(output_path(save_file_name))
+
+
+def _keep(save_file_name):
+    print(f"{save_file_name} is up to date, keeping the existing file")
+    record_cached(output_path(save_file_name))
+
+
+def is_fresh(save_file_name, key):
+    """Checks whether the saved chart was rendered from inputs matching key.
+
+    If so, the existing file is kept and the chart does not need to be drawn at all.
+    """
+    if not _matches(save_file_name, key):
+        return False
+    _keep(save_file_name)
+    return True
+
+
+def all_fresh(save_file_names, key):
+    """Checks whether every chart a script saves was rendered from inputs matching key.
+
+    For scripts whose charts depend on each other (e.g. a shared y-axis range), so they
+    are either all kept or all re-rendered.
+    """
+    if not all(_matches(name, key) for name in save_file_names):
+        return False
+    for name in save_file_names:
+        _keep(name)
+    return True
+
+
+def record(save_file_name, key):
+    """Stores the key of a chart that has just been saved."""
+    os.makedirs(render_cache_directory, exist_ok=True)
+    key_path = _key_path(save_file_name)
+    # Write then rename, so a half-written key is never mistaken for a valid one
+    tmp_path = f"{key_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(key)
+    os.replace(tmp_path, key_path)
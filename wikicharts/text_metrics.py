@@ -0,0 +1,43 @@
+import threading
+from functools import lru_cache
+
+from .config import register_fonts
+
+# Measuring at 72 dpi gives sizes in points, the unit annotation offsets are given in
+POINTS_DPI = 72
+
+# Renderers aren't meant to be shared between threads
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _renderer():
+    from matplotlib.backends.backend_agg import RendererAgg
+    register_fonts()
+    return RendererAgg(1, 1, POINTS_DPI)
+
+
+@lru_cache(maxsize=None)
+def font_properties(family, size, weight="normal"):
+    """Returns the (shared) FontProperties for a font, which matplotlib resolves to a font file once."""
+    from matplotlib.font_manager import FontProperties
+    return FontProperties(family=family, size=size, weight=weight)
+
+
+@lru_cache(maxsize=4096)
+def text_extent(text, family, size, weight="normal"):
+    """Returns the (width, height) of a string in points, as matplotlib renders it.
+
+    Text is laid out the same way at every dpi, so this also holds for saved 300 dpi
+    charts. Results are memoized per (text, font, size, weight).
+    """
+    with _lock:
+        width, height, _ = _renderer().get_text_width_height_descent(
+            text, font_properties(family, size, weight), ismath=False
+        )
+    return width, height
+
+
+def text_width(text, family, size, weight="normal"):
+    """Returns the width of a string in points, as matplotlib renders it."""
+    return text_extent(text, family, size, weight)[0]
@@ -1,10 +1,12 @@
 from .wikicharts import Wikichart
+from .render_cache import render_key, is_fresh
 import pandas as pd
+from . import datasets
 from .config import wmf_colors
 from datetime import  datetime
-import matplotlib.pyplot as plt
 
 from .parameters import readers_data_path
+from .data_utils import as_float_columns
 
 def main():
     print("Generating Unique Devices chart...")
@@ -15,26 +17,14 @@ def main():
     display_flag = True
 
     #---CLEAN DATA---
-    df = pd.read_csv(readers_data_path, sep='\t')
-    
     start_date = "2018-05-01"
     end_date = datetime.today()
     
-    df['month'] = pd.to_datetime(df['month'])
-    
-    df = df[df["month"].isin(pd.date_range(start_date, end_date))]
+    # Plotted directly with matplotlib below, so as plain floats
+    df = as_float_columns(datasets.load_range(readers_data_path, start_date, end_date, columns=['unique_devices']))
     
     month_interest = df.iloc[-1]['month'].month
     
-    df = df.drop(columns=[
-        'automated_pageviews', 
-        'desktop', 
-        'interactions', 
-        'mobileweb', 
-        'previews_seen', 
-        'total_pageview'
-    ])
-    
     # Drop rows with data error
     df_a = df[df["month"] <= "2021-01-01"]
     df_b = df[df["month"] >= "2022-07-01"]
@@ -46,30 +36,35 @@ def main():
     # Subset to highlight the last two months
     yoy_highlight = pd.concat([monthly_df.iloc[-2,:], monthly_df.iloc[-1,:]], axis=1).T
 
+    cache_key = render_key(df, script=__file__)
+    if is_fresh(save_file_name, cache_key):
+        return
+
     #---MAKE CHART---
     chart = Wikichart(start_date, end_date, df)
     chart.init_plot(width=12)
+    ax = chart.gca()
     
     # Pot data, because of the break in the dataset, we don't use the wikichart class functions
     
-    plt.plot(df_a.month, df_a.unique_devices, 
-             label='_nolegend_', 
-             color=wmf_colors['brightblue'], 
-             linewidth=2, zorder=6)
-    plt.plot(df_b.month, df_b.unique_devices, 
-             label='_nolegend_', 
-             color=wmf_colors['brightblue'], 
-             linewidth=2, zorder=6)
+    ax.plot(df_a.month, df_a.unique_devices, 
+            label='_nolegend_', 
+            color=wmf_colors['brightblue'], 
+            linewidth=2, zorder=6)
+    ax.plot(df_b.month, df_b.unique_devices, 
+            label='_nolegend_', 
+            color=wmf_colors['brightblue'], 
+            linewidth=2, zorder=6)
     
-    plt.scatter(monthly_df.month, monthly_df.unique_devices, label='_nolegend_', color=wmf_colors['brightblue'], zorder=7)
+    ax.scatter(monthly_df.month, monthly_df.unique_devices, label='_nolegend_', color=wmf_colors['brightblue'], zorder=7)
     highlight_radius = 1000000
-    plt.scatter(yoy_highlight.month, 
-                yoy_highlight.unique_devices, 
-                label='_nolegend_', 
-                s=(highlight_radius**0.5), 
-                facecolors='none', 
-                edgecolors=wmf_colors['yellow'], 
-                zorder=8)
+    ax.scatter(yoy_highlight.month, 
+               yoy_highlight.unique_devices, 
+               label='_nolegend_', 
+               s=(highlight_radius**0.5), 
+               facecolors='none', 
+               edgecolors=wmf_colors['yellow'], 
+               zorder=8)
     
     # Draw error area
     block_off_start = datetime.strptime("2021-01-01", '%Y-%m-%d')
@@ -86,7 +81,7 @@ def main():
                    y='unique_devices', 
                    num_annotation=chart.calc_finalcount(y='unique_devices'))
     
-    chart.finalize_plot(save_file_name, display=display_flag)
+    chart.finalize_plot(save_file_name, display=display_flag, cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
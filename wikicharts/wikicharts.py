@@ -6,37 +6,47 @@ from math import ceil, floor, log10
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.dates as dates
-import matplotlib.ticker as ticker
-from matplotlib.patches import Rectangle
-from matplotlib import font_manager
 import warnings
-import math
 from math import ceil, floor, log10
 
-from .data_utils import simple_num_format, split_df_by_col, format_perc, gen_keys, closestdivisible
+from .data_utils import simple_num_format, simple_num_format_array, split_df_by_col, format_perc, gen_keys, as_float_columns
 from .parameters import (
     author, 
     editing_data_path,
     readers_data_path,
     unique_devices_data_path,
-    save_directory,
     content_gap_data_path
 )
 
-from .config import wmf_colors, style_parameters, wmf_regions
-from PIL import ImageFont
+from .config import wmf_colors, style_parameters, wmf_regions, register_fonts
+from .outputs import output_path, record_output
+from .derivatives import Derivatives
+from .text_metrics import text_extent, text_width
+from .label_layout import spread_positions
+from .yrange import standardized_limits, trendline
+from . import render_cache
 
 
 class Wikichart():
     """A class for creating and managing plots specifically designed for Wikipedia-style visualizations."""
-    def __init__(self, start_date, end_date, dataset, set_month_interest=True, time_col='month', yoy_highlight=None):
-        """Initializes the chart with dates and data, setting the month of interest for highlighting specific data points."""
+    # Whether init_plot creates figures through pyplot. Set to False to create them directly
+    # from matplotlib.figure.Figure instead, which keeps them out of pyplot's global figure
+    # registry so that charts can safely be drawn concurrently in threads.
+    use_pyplot = True
+
+    def __init__(self, start_date, end_date, dataset, set_month_interest=True, time_col='month', yoy_highlight=None, derivatives=None):
+        """Initializes the chart with dates and data, setting the month of interest for highlighting specific data points.
+
+        derivatives are the Derivatives of the metric file the dataset was taken from (see
+        datasets.derivatives), which are then shared with other charts of the same file.
+        """
         self.start_date = start_date
         self.end_date = end_date
-        self.df = dataset
+        # Compact dtypes (nullable integers with missing values) can't be plotted as they are
+        self.df = as_float_columns(dataset)
+        self.time_col = time_col
+        self._file_derivatives = derivatives
+        self._derivatives = None
         # Sets month_interest to the last month in the dataset, or to the current month
         if set_month_interest:
             self.month_interest = self.df.iloc[-1][time_col].month
@@ -49,64 +59,100 @@ class Wikichart():
         self.yranges = []
         self.ynumticks = []
 
-    def init_plot(self, width=10, height=6, subplotsx=1, subplotsy=1, fignum=0):
-        """Initializes the plotting area with specified dimensions and number of subplots."""
-        self.fig, self.ax = plt.subplots(subplotsx, subplotsy, num=fignum)
+    def init_plot(self, width=10, height=6, subplotsx=1, subplotsy=1, fignum=0, use_pyplot=None):
+        """Initializes the plotting area with specified dimensions and number of subplots.
+
+        fignum is only used for pyplot figures; use_pyplot defaults to Wikichart.use_pyplot.
+        """
+        # matplotlib is only imported once a chart is drawn, so that charts which are
+        # already up to date (see render_cache) never load it
+        register_fonts()
+        if use_pyplot is not None:
+            self.use_pyplot = use_pyplot
+        if self.use_pyplot:
+            import matplotlib.pyplot as plt
+            self.fig, self.ax = plt.subplots(subplotsx, subplotsy, num=fignum)
+        else:
+            from matplotlib.figure import Figure
+            self.fig = Figure()
+            self.ax = self.fig.subplots(subplotsx, subplotsy)
         self.fig.set_figwidth(width)
         self.fig.set_figheight(height)
 
+    @property
+    def derivatives(self):
+        """Derived series (YoY change, same month of each year...) of the chart's metrics.
+
+        Taken from the metric file's derivatives for the chart's months if they were given,
+        otherwise computed from the chart's data once per chart.
+        """
+        if self._derivatives is None:
+            if self._file_derivatives is not None:
+                months = self.df[self.time_col]
+                self._derivatives = self._file_derivatives.view(months.iloc[0], months.iloc[-1])
+            else:
+                self._derivatives = Derivatives(self.df.set_index(self.time_col).select_dtypes('number'))
+        return self._derivatives
+
+    def gca(self):
+        """Returns the chart's current axes (the last subplot for charts with several)."""
+        return self.fig.gca()
+
     def plot_line(self, x, y, col, legend_label='_nolegend_', linewidth=2):
         """Plots a basic line chart."""
-        plt.plot(self.df[str(x)], self.df[str(y)],
-                 label=legend_label,
-                 color=col,
-                 zorder=3,
-                 linewidth=linewidth)
+        self.gca().plot(self.df[str(x)], self.df[str(y)],
+                        label=legend_label,
+                        color=col,
+                        zorder=3,
+                        linewidth=linewidth)
         
     def plot_bar(self, x, y, col = wmf_colors['blue'], legend_label='_nolegend_', width=10):
         """Plots a basic bar chart."""
-        plt.bar(self.df[str(x)], self.df[str(y)], 
-                color=col, 
-                label=legend_label, 
-                width=width)
+        self.gca().bar(self.df[str(x)], self.df[str(y)], 
+                       color=col, 
+                       label=legend_label, 
+                       width=width)
     
 
     def plot_monthlyscatter(self, x, y, col, legend_label='_nolegend_'):
         """Plots scatter points for a specific month across multiple years."""
-        monthly_df = self.df[self.df[str(x)].dt.month == self.month_interest]
-        plt.scatter(monthly_df[str(x)], monthly_df[str(y)],
-                    label=legend_label,
-                    color=col,
-                    zorder=4)
+        monthly_df = self.derivatives.same_month(self.month_interest)
+        self.gca().scatter(monthly_df.index, monthly_df[str(y)],
+                           label=legend_label,
+                           color=col,
+                           zorder=4)
         # Note: due to a bug in matplotlib, the grid's zorder is fixed at 2.5 so everything plotted must be above 2.5
         
 
     def plot_yoy_highlight(self, x, y, highlight_radius=1000, col=wmf_colors['yellow'], legend_label='_nolegend_'):
         """Highlights year-over-year changes with a circular marker."""
-        yoy_highlight = pd.concat([self.df.iloc[-13, :], self.df.iloc[-1, :]], axis=1).T
-        plt.scatter(yoy_highlight[str(x)], yoy_highlight[str(y)],
-                    label=legend_label,
-                    s=highlight_radius,
-                    facecolors='none',
-                    edgecolors=col,
-                    zorder=5)
+        yoy_highlight = self.derivatives.yoy_points()
+        self.gca().scatter(yoy_highlight.index, yoy_highlight[str(y)],
+                           label=legend_label,
+                           s=highlight_radius,
+                           facecolors='none',
+                           edgecolors=col,
+                           zorder=5)
         # Note: due to a bug in matplotlib, the grid's zorder is fixed at 2.5 so everything plotted must be above 2.5
         
 
     def plot_data_loss(self, x, y1, y2, data_loss_df, col=wmf_colors['base80'], legend_label='_nolegend_'):
         """Fills an area to indicate data loss or data exclusion."""
-        plt.fill_between(data_loss_df[str(x)], data_loss_df[str(y1)], data_loss_df[str(y2)],
-                         label=legend_label,
-                         color=col,
-                         edgecolor=col,
-                         zorder=3)
+        self.gca().fill_between(data_loss_df[str(x)], data_loss_df[str(y1)], data_loss_df[str(y2)],
+                                label=legend_label,
+                                color=col,
+                                edgecolor=col,
+                                zorder=3)
 
     def block_off(self, blockstart, blockend, rectangle_text="", xbuffer=7):
         """Blocks off a range of dates with a rectangular overlay, optionally adding text."""
+        import matplotlib.dates as mdates
+        from matplotlib.patches import Rectangle
         xstart = mdates.date2num(blockstart)
         xend = mdates.date2num(blockend)
         block_width = xend - xstart
-        ymin, ymax = plt.gca().get_ylim()
+        ax = self.gca()
+        ymin, ymax = ax.get_ylim()
         block_height = ymax - ymin
         
         rect = Rectangle((xstart - xbuffer, ymin), block_width + 2 * xbuffer, block_height,
@@ -115,58 +161,60 @@ class Wikichart():
                          edgecolor=wmf_colors['black75'], 
                          facecolor='white',  
                          zorder=5)
-        plt.gca().add_patch(rect)
+        ax.add_patch(rect)
         
         annotation_x = xstart + (block_width / 2)
-        ytick_values = plt.gca().get_yticks()
+        ytick_values = ax.get_yticks()
         ystart = ytick_values[0]
         annotation_y = ystart + (block_height / 2)
-        rectangle_textbox = plt.gca().text(annotation_x, annotation_y, rectangle_text,
-                                           ha='center',
-                                           va='center',
-                                           color=wmf_colors['black25'],
-                                           family='Montserrat',
-                                           fontsize=14,
-                                           wrap=True,
-                                           bbox=dict(pad=100, boxstyle='square', fc='none', ec='none'),
-                                           zorder=8)
+        rectangle_textbox = ax.text(annotation_x, annotation_y, rectangle_text,
+                                    ha='center',
+                                    va='center',
+                                    color=wmf_colors['black25'],
+                                    family='Montserrat',
+                                    fontsize=14,
+                                    wrap=True,
+                                    bbox=dict(pad=100, boxstyle='square', fc='none', ec='none'),
+                                    zorder=8)
         rectangle_textbox._get_wrap_line_width = lambda: 300.
 
     def format(self, title, author=author, data_source="N/A", ybuffer=True, format_x_yearly=True, format_x_monthly=False, radjust=0.85, ladjust=0.1, tadjust=0.9, badjust=0.1, titlepad=0, perc=False):
         """Applies basic formatting to the chart, including title setup, axis labels, and grid lines."""
+        ax = self.gca()
         for pos in ['right', 'top', 'bottom', 'left']:
-            plt.gca().spines[pos].set_visible(False)
+            ax.spines[pos].set_visible(False)
         # Add gridlines    
-        plt.grid(axis='y', zorder=-1, color=wmf_colors['black25'], linewidth=0.25, clip_on=False)
+        ax.grid(axis='y', zorder=-1, color=wmf_colors['black25'], linewidth=0.25, clip_on=False)
         # Format title
         custom_title = f'{title}'
-        plt.title(custom_title, font=style_parameters['font'], 
-                  fontsize=style_parameters['title_font_size'], 
-                  weight='bold', 
-                  loc='left', 
-                  wrap=True, 
-                  pad=titlepad)
+        ax.set_title(custom_title, font=style_parameters['font'], 
+                     fontsize=style_parameters['title_font_size'], 
+                     weight='bold', 
+                     loc='left', 
+                     wrap=True, 
+                     pad=titlepad)
         # Expand bottom margin to make romo for author and data source info.
-        plt.subplots_adjust(bottom=badjust, right=radjust, left=ladjust, top=tadjust)
+        self.fig.subplots_adjust(bottom=badjust, right=radjust, left=ladjust, top=tadjust)
         # Format x-axis labels — yearly x-axis labels on January
         if format_x_yearly == True:
-            plt.xticks(fontname=style_parameters['font'], fontsize=style_parameters['text_font_size'])
+            for label in ax.get_xticklabels():
+                label.set(fontname=style_parameters['font'], fontsize=style_parameters['text_font_size'])
             date_labels = []
             date_labels_raw = pd.date_range(self.start_date, self.end_date, freq='AS-JAN')
             for dl in date_labels_raw:
                 date_labels.append(datetime.strftime(dl, '%Y'))
-            plt.xticks(ticks=date_labels_raw, labels=date_labels)
+            ax.set_xticks(date_labels_raw)
+            ax.set_xticklabels(date_labels)
          # Format x-axis labels — monthly labels
         if format_x_monthly == True:
             date_labels = []
             for dl in self.df['timestamp']:
                 date_labels.append(datetime.strftime(dl, '%b'))
-            plt.xticks(ticks=self.df['timestamp'], labels=date_labels, fontsize=14, fontname='Montserrat')
+            ax.set_xticks(self.df['timestamp'])
+            ax.set_xticklabels(date_labels, fontsize=14, fontname='Montserrat')
             
         # Buffer y-axis range to be 2/3rds of the total y axis range
-        # Note: gca = get current axis
         if ybuffer == True:
-            ax = plt.gca()
             current_ymin, current_ymax = ax.get_ylim()
             current_yrange = current_ymax - current_ymin
             new_ymin = current_ymin - current_yrange / 4
@@ -179,20 +227,17 @@ class Wikichart():
                     new_ymax = current_ymin + current_ymax
                 ax.set_ylim([new_ymin, new_ymax])
                 # Prevent any gridline clipping, but may make the graph seem overcluttered
-                current_values = plt.gca().get_yticks()
+                current_values = ax.get_yticks()
                 ax.set_ylim([current_values[0], new_ymax])
                 
         # Format y-axis labels         
         warnings.filterwarnings("ignore")
-        current_values = plt.gca().get_yticks()
-        new_labels = []
-        for y_value in current_values:
-            new_label = simple_num_format(y_value, perc=perc)
-            new_labels.append(new_label)
-        plt.gca().set_yticklabels(new_labels)
-        plt.yticks(fontname=style_parameters['font'], fontsize=style_parameters['text_font_size'])
+        current_values = ax.get_yticks()
+        ax.set_yticklabels(simple_num_format_array(current_values, perc=perc))
+        for label in ax.get_yticklabels():
+            label.set(fontname=style_parameters['font'], fontsize=style_parameters['text_font_size'])
         # Bottom annotation
-        plt.figtext(
+        self.fig.text(
             0.1, 0.025,
             f"Graph Notes: Created by {author} on {date.today()} using data from {data_source}",
             family=style_parameters['font'],
@@ -215,11 +260,9 @@ class Wikichart():
                 num_annotation = f"{last_y:.2f}"
     
         if legend_label:
-            font_path = 'wikicharts/resources/fonts/Montserrat/static/Montserrat-Bold.ttf'
-            font = ImageFont.truetype(font_path, style_parameters['text_font_size'])
-            bbox = font.getbbox(legend_label)
-            labelsize = (bbox[2] - bbox[0], bbox[3] - bbox[1])
-            dynamic_spacing = labelsize[0] + 5
+            # Measured the way matplotlib will draw the label below
+            label_width = text_width(legend_label, style_parameters['font'], style_parameters['text_font_size'], weight='bold')
+            dynamic_spacing = label_width + 5
         else:
             dynamic_spacing = 10
             
@@ -227,28 +270,29 @@ class Wikichart():
         legend_label_x_offset = 20 + xpad
         num_annotation_x_offset = legend_label_x_offset + dynamic_spacing
 
+        ax = self.gca()
         if legend_label:
-            plt.annotate(legend_label,
-                            xy=(last_x, last_y),
-                            xytext=(legend_label_x_offset, -5 + ypad),
-                            textcoords='offset points',
-                            color=label_color,
-                            fontsize=style_parameters['text_font_size'],
-                            weight='bold',
-                            family=style_parameters['font'],
-                            bbox=dict(pad=5, facecolor="white", edgecolor="none", alpha=0.7),
-                            zorder=zorder)
+            ax.annotate(legend_label,
+                        xy=(last_x, last_y),
+                        xytext=(legend_label_x_offset, -5 + ypad),
+                        textcoords='offset points',
+                        color=label_color,
+                        fontsize=style_parameters['text_font_size'],
+                        weight='bold',
+                        family=style_parameters['font'],
+                        bbox=dict(pad=5, facecolor="white", edgecolor="none", alpha=0.7),
+                        zorder=zorder)
 
     
-        plt.annotate(num_annotation,
-                     xy=(last_x, last_y),
-                     xytext=(num_annotation_x_offset, -5 + ypad),
-                     textcoords='offset points',
-                     color=num_color,
-                     fontsize=style_parameters['text_font_size'],
-                     weight='bold',
-                     family=style_parameters['font'],
-                     zorder=zorder)
+        ax.annotate(num_annotation,
+                    xy=(last_x, last_y),
+                    xytext=(num_annotation_x_offset, -5 + ypad),
+                    textcoords='offset points',
+                    color=num_color,
+                    fontsize=style_parameters['text_font_size'],
+                    weight='bold',
+                    family=style_parameters['font'],
+                    zorder=zorder)
 
     def annotate_mean(self, x, y, line_color='red', line_width=2, line_style='-', alpha=0.5, text_color='darkred', text_xoffset=85, alignment_adjustment=0.005, zorder=10, show_median=False):
         """Calculates and annotates the mean and optionally the median for a data series."""
@@ -276,7 +320,7 @@ class Wikichart():
             va = 'center'
             
         # Place text for the mean and median values in percentage format rounded to 1 decimal space
-        plt.text(
+        self.gca().text(
             x=label_x_position,
             y=label_y_position,
             s=f'Mean: {percentage_mean_value:.1f}% / Median: {percentage_median_value:.1f}%' if show_median else f'Mean: {percentage_mean_value:.1f}%',
@@ -290,10 +334,9 @@ class Wikichart():
 
     def calc_yoy(self, y, yoy_note=""):
         """Calculates the year-over-year percentage change for a specified column."""
-        yoy_highlight = pd.concat([self.df.iloc[-13, :], self.df.iloc[-1, :]], axis=1).T
-        yoy_change_percent = ((yoy_highlight[str(y)].iat[-1] - yoy_highlight[str(y)].iat[0]) / yoy_highlight[str(y)].iat[0]) * 100
+        yoy_change_percent = self.derivatives.yoy()[str(y)].iat[-1] * 100
         
-        if math.isnan(yoy_change_percent):
+        if pd.isna(yoy_change_percent):
             yoy_annotation = "YoY N/A"
         elif yoy_change_percent > 0:
             yoy_annotation = f" +{yoy_change_percent:.1f}% YoY" + " " + yoy_note
@@ -307,33 +350,42 @@ class Wikichart():
         count_annotation = simple_num_format(value=final_count)
         return count_annotation
 
-    def calc_yspacing(self, ys):
-        """Calculates vertical spacing for annotations to avoid overlap."""
-        lastys = self.df[ys].iloc[-1]
-        lastys = lastys.to_frame('lasty')
+    def calc_yspacing(self, ys, min_distance=None):
+        """Calculates vertical padding (in points) for annotations at the last values of ys so that they don't overlap.
+
+        Positions are compared as drawn, so this works at any scale. min_distance is the
+        space each annotation needs, by default a line of annotation text. Call it once
+        the axes limits are final (after format).
+        """
+        if min_distance is None:
+            min_distance = style_parameters['text_font_size'] * 1.2
+        ax = self.gca()
+        # Apply any pending autoscaling, so that transData is up to date
+        ax.get_ylim()
+        lastys = self.df[ys].iloc[-1].astype(float).to_frame('lasty')
+        # In points, the unit annotation offsets are given in
+        positions = ax.transData.transform(
+            np.column_stack([np.zeros(len(lastys)), lastys['lasty']])
+        )[:, 1] * 72 / self.fig.dpi
+        lastys['ypad'] = np.nan_to_num(spread_positions(positions, min_distance) - positions)
         lastys = lastys.sort_values(by=['lasty'], ascending=True)
-        lastys['ypad'] = 0
-    
-        padmultiplier = 1
-        # Set remaining two paddings
-        for i in range(1, len(ys)):
-            valuedistance = lastys.iloc[i]['lasty'] - lastys.iloc[i - 1]['lasty']
-            # Add padding if values are too close
-            if valuedistance < 5000000:
-                lastys.at[lastys.iloc[i].name, 'ypad'] = 10 * padmultiplier
-                padmultiplier += 1
-            else:
-                padmultiplier = 1
         return lastys
 
     def multi_yoy_annotate(self, ys, key, annotation_fxn, x='month', xpad=0, dynamic_spacing = 10):
         """Annotates multiple series in a plot with year-over-year changes or final counts."""
-        lastys = self.calc_yspacing(ys)
+        annotations = {y: annotation_fxn(y=y) for y in ys}
+        # Leave room for the tallest annotation, plus a little space
+        texts = list(annotations.values()) + list(key.loc[ys, 'labelname'])
+        text_height = max(
+            text_extent(text, style_parameters['font'], style_parameters['text_font_size'], weight='bold')[1]
+            for text in texts
+        )
+        lastys = self.calc_yspacing(ys, min_distance=text_height + 2)
         for i in range(len(ys)):
             y = lastys.iloc[i].name
             self.annotate(x=x,
                           y=y,
-                          num_annotation=annotation_fxn(y=y),
+                          num_annotation=annotations[y],
                           legend_label=key.loc[y, 'labelname'],
                           label_color=key.loc[y, 'color'],
                           xpad=xpad,
@@ -342,22 +394,22 @@ class Wikichart():
 
     def top_annotation(self, x=0.05, y=0.87, annotation_text=""):
         """Adds a custom annotation at the top of the chart under the title."""
-        plt.figtext(x, y, annotation_text, family=style_parameters['font'], fontsize=10, color=wmf_colors['black75'])
+        self.fig.text(x, y, annotation_text, family=style_parameters['font'], fontsize=10, color=wmf_colors['black75'])
 
     def add_legend(self, legend_fontsize=14):
         """Adds a legend to the plot with custom formatting."""
-        matplotlib.rcParams['legend.fontsize'] = legend_fontsize
-        plt.legend(frameon=False,
-                   loc="upper center",
-                   bbox_to_anchor=(0.5, -0.15,),
-                   fancybox=False,
-                   shadow=False,
-                   ncol=4,
-                   prop={"family": style_parameters['font']})
+        self.gca().legend(frameon=False,
+                          loc="upper center",
+                          bbox_to_anchor=(0.5, -0.15,),
+                          fancybox=False,
+                          shadow=False,
+                          ncol=4,
+                          prop={"family": style_parameters['font'], "size": legend_fontsize})
 
     def add_block_legend(self):
         """Adds a blocked out area to the legend."""
-        self.fig.patches.extend([plt.Rectangle((0.05, 0.868), 0.01, 0.02,
+        from matplotlib.patches import Rectangle
+        self.fig.patches.extend([Rectangle((0.05, 0.868), 0.01, 0.02,
                                                linewidth=0.1,  
                                                hatch='//////',
                                                edgecolor='black', 
@@ -366,12 +418,40 @@ class Wikichart():
                                                transform=self.fig.transFigure,
                                                figure=self.fig)])
 
-    def finalize_plot(self, save_file_name, display=True):
-        """Saves plot to a file according to specified parameters and displays it"""
-        save_path = save_directory + save_file_name
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        if display:
+    def finalize_plot(self, save_file_name, display=True, cache_key=None, close=True):
+        """Saves plot to a file according to specified parameters and displays it.
+
+        Pass the render_cache.render_key the chart was checked against as cache_key so
+        the next run can skip it if nothing has changed. The figure is closed afterwards
+        unless close is False.
+        """
+        save_path = output_path(save_file_name)
+        self.fig.savefig(save_path, dpi=300, bbox_inches='tight')
+        record_output(save_path)
+        if cache_key is not None:
+            render_cache.record(save_file_name, cache_key)
+        # Figures created without pyplot can't be shown in a window
+        if display and self.use_pyplot:
+            import matplotlib.pyplot as plt
             plt.show()
+        if close:
+            self.close()
+
+    def close(self):
+        """Releases the chart's figure so its memory can be reclaimed."""
+        if self.fig is None:
+            return
+        if self.use_pyplot:
+            import matplotlib.pyplot as plt
+            plt.close(self.fig)
+        self.fig = None
+        self.ax = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def plot_subplots_lines(self, x, key, linewidth=2, num_charts=4, subplot_title_size=12):
         """Plots lines on multiple subplots within the figure."""
@@ -392,16 +472,15 @@ class Wikichart():
 
     def plot_multi_trendlines(self, x, key, linewidth=1, num_charts=4):
         """Plots trend lines on multiple subplots within the figure."""
-        x_num = dates.date2num(self.df[x])
+        import matplotlib.dates as mdates
+        x_num = mdates.date2num(self.df[x])
         i = 0
         for row in self.ax:
             for axis in row:
                 if i < num_charts:
                     y_label = key.iloc[i]['labelname']
-                    z = np.polyfit(x_num, self.df[y_label], 1)
-                    p = np.poly1d(z)
                     axis.plot(x_num,
-                              p(x_num),
+                              trendline(x_num, self.df[y_label]),
                               label='_no_legend_,',
                               color='black',
                               zorder=4,
@@ -410,6 +489,8 @@ class Wikichart():
 
     def block_off_multi(self, blockstart, blockend, xbuffer=6):
         """Blocks off a set of dates on multiple subplots within the figure."""
+        import matplotlib.dates as mdates
+        from matplotlib.patches import Rectangle
         for row in self.ax:
             for axis in row:
                 # Convert dates to x axis coordinates
@@ -445,7 +526,8 @@ class Wikichart():
 
     def format_subplots(self, title, key, author=author, data_source="N/A", radjust=0.85, ladjust=0.1, tadjust=0.85, badjust=0.1, num_charts=4, tickfontsize=12, mo_in_title=True):
         """Applies formatting across multiple subplots within the figure."""
-        plt.subplots_adjust(bottom=badjust, right=radjust, left=ladjust, top=tadjust, wspace=0.2, hspace=0.4)
+        import matplotlib.dates as mdates
+        self.fig.subplots_adjust(bottom=badjust, right=radjust, left=ladjust, top=tadjust, wspace=0.2, hspace=0.4)
         i = 0
         for row in self.ax:
             for axis in row:
@@ -463,14 +545,10 @@ class Wikichart():
                     axis.xaxis.set_major_locator(mdates.YearLocator(month=1))
                     xaxisFormatter = mdates.DateFormatter('%Y')
                     axis.xaxis.set_major_formatter(xaxisFormatter)
-                    current_values = axis.get_yticklabels()
-                    new_labels = []
+                    current_values = [y_label.get_position()[1] for y_label in axis.get_yticklabels()]
                     
                     # Format y labels in abbreviated notation.
-                    for y_label in current_values:
-                        y_value = float(y_label.get_position()[1])
-                        new_label = simple_num_format(y_value)
-                        new_labels.append(new_label)
+                    new_labels = simple_num_format_array(current_values)
                     axis.set_yticklabels(new_labels, fontfamily=style_parameters['font'], fontsize=tickfontsize)
                 else:
                     axis.set_visible(False)
@@ -488,7 +566,7 @@ class Wikichart():
                           fontsize=style_parameters['title_font_size'], 
                           fontproperties={'family': style_parameters['font'], 
                                           'weight': 'bold'})
-        plt.figtext(
+        self.fig.text(
             0.05, 0.01,
             f"Graph Notes: Created by {author} on {date.today()} using data from {data_source}",
             fontsize=8, va="bottom", ha="left",
@@ -519,50 +597,28 @@ class Wikichart():
 
     def standardize_yrange(self, yrange, num_ticks, std_cutoff=15):
         """Sets the y-axis range for a single plot based on the standard number of ticks and a cutoff for very small ranges."""
-        std_yinterval = yrange / (num_ticks - 1)
-        ax = plt.gca()
-        current_ymin, current_ymax = ax.get_ylim()
-        current_yrange = current_ymax - current_ymin
-        if current_yrange > (yrange / std_cutoff):
-            current_ymedian = current_ymin + ((current_ymax - current_ymin) / 2)
-            if (num_ticks % 2) == 0:
-                new_ymedian = closestdivisible(current_ymedian, std_yinterval)
-                if new_ymedian < current_ymedian:
-                    new_ymin = new_ymedian - (std_yinterval * (num_ticks / 2 - 1))
-                else:
-                    new_ymin = new_ymedian - (std_yinterval * (num_ticks / 2))
-            else:
-                new_ymedian = closestdivisible(current_ymedian, std_yinterval)
-                new_ymin = new_ymedian - (yrange / 2)
-            new_ymin = max(0, new_ymin)
-            new_ymax = new_ymin + yrange
-            ax.set_ylim(new_ymin, new_ymax)
+        ax = self.gca()
+        limits = standardized_limits(*ax.get_ylim(), yrange, num_ticks, std_cutoff=std_cutoff)
+        if limits is not None:
+            ax.set_ylim(*limits)
 
     def standardize_subplotyrange(self, yrange, num_ticks, num_charts=4, std_cutoff=15):
         """Standardizes the y-axis range across multiple subplots within the figure based on a standard number of ticks and a cutoff for very small ranges."""
-        std_yinterval = yrange / (num_ticks - 1)
         i = 0
         for row in self.ax:
             for axis in row:
                 if i < num_charts:
-                    current_ymin, current_ymax = axis.get_ylim()
-                    current_yrange = current_ymax - current_ymin
-                    if current_yrange > (yrange / std_cutoff):
-                        current_ymedian = current_ymin + ((current_ymax - current_ymin) / 2)
-                        if (num_ticks % 2) == 0:
-                            new_ymedian = closestdivisible(current_ymedian, std_yinterval)
-                            if new_ymedian < current_ymedian:
-                                new_ymin = new_ymedian - (std_yinterval * (num_ticks / 2 - 1))
-                            else:
-                                new_ymin = new_ymedian - (std_yinterval * (num_ticks / 2))
-                        else:
-                            new_ymedian = closestdivisible(current_ymedian, std_yinterval)
-                            new_ymin = new_ymedian - (yrange / 2)
-                        new_ymin = max(0, new_ymin)
-                        new_ymax = new_ymin + yrange
-                        axis.set_ylim(new_ymin, new_ymax)
+                    limits = standardized_limits(*axis.get_ylim(), yrange, num_ticks, std_cutoff=std_cutoff)
+                    if limits is not None:
+                        axis.set_ylim(*limits)
                 i += 1
 
+    def set_subplot_ylims(self, ylims):
+        """Sets the y-axis limits of each subplot from a list of (ymin, ymax), e.g. planned with yrange.standardized_limits. Subplots with None (or past the end of the list) keep their autoscaled limits."""
+        for axis, limits in zip(self.ax.flat, ylims):
+            if limits is not None:
+                axis.set_ylim(*limits)
+
     def get_ytickrange(self):
         """Returns the range of y-ticks for the current axis."""
         ticks = self.ax.get_yticklabels()
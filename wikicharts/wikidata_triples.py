@@ -1,5 +1,6 @@
 from datetime import date, datetime, timedelta
 from .wikicharts import Wikichart
+from .render_cache import render_key, is_fresh
 from .config import wmf_colors
 import pandas as pd
 
@@ -26,6 +27,10 @@ def main():
     
     #---PREPARE TO PLOT
 
+    cache_key = render_key(df, script=__file__)
+    if is_fresh('triples_growth_chart.png', cache_key):
+        return
+
     #---PLOT---
     chart = Wikichart(start_date,end_date,df)
     chart.init_plot(width=12)
@@ -36,7 +41,7 @@ def main():
     chart.annotate(x='month', 
                    y='total_triples', 
                    num_annotation=chart.calc_finalcount(y='total_triples'))
-    chart.finalize_plot('triples_growth_chart.png',display=display_flag)
+    chart.finalize_plot('triples_growth_chart.png', display=display_flag, cache_key=cache_key)
 
 if __name__ == "__main__":
     main()
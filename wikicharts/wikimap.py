@@ -1,12 +1,25 @@
-import matplotlib.pyplot as plt
-from mpl_toolkits.axes_grid1 import make_axes_locatable
 import calendar
 from datetime import date
+import numpy as np
 import pandas as pd
 
-from .config import wmf_colors, wmf_regions, style_parameters
-from .data_utils import simple_num_format
-from .parameters import author,save_directory
+from .config import wmf_colors, wmf_regions, style_parameters, register_fonts
+from .data_utils import simple_num_format_array
+from .parameters import author
+from .outputs import output_path, record_output
+from . import render_cache
+
+def polygon_rows(geometry):
+    """Returns the row of each polygon GeoSeries.plot draws for a geometry column.
+
+    Empty geometries are skipped and multipolygons are drawn as one polygon per part.
+    """
+    rows = []
+    for i, geom in enumerate(geometry):
+        if geom is None or geom.is_empty:
+            continue
+        rows.extend([i] * (len(geom.geoms) if geom.geom_type.startswith("Multi") else 1))
+    return np.array(rows, dtype=int)
 
 class Wikimap():
     """A class for creating and managing map-based visualizations."""
@@ -24,7 +37,11 @@ class Wikimap():
         display_month=True
     ):
         """Initializes the map with specified dimensions and data."""
+        # matplotlib is only imported once a map is drawn, so that maps which are already
+        # up to date (see render_cache) never load it
+        import matplotlib.pyplot as plt
         self.df = dataset
+        register_fonts()
         self.fig, self.ax = plt.subplots(1, 1, num=fignum)
         self.fig.set_figwidth(width)
         self.fig.set_figheight(height)
@@ -33,22 +50,10 @@ class Wikimap():
         self.vmin = None
         self.vmax = None
         
-        # Format title
-        if display_month and month is not None:
-            # Extract month as integer
-            month_int = month.month if isinstance(month, pd.Timestamp) else month
-            month_name = f"({calendar.month_name[month_int]})"
-        else:
-            month_name = ""
+        self.countries = None
+        self.region_labels = {}
+        self.set_title(title, month=month, display_month=display_month, titlepad=titlepad)
 
-        custom_title = f'{title} {month_name}'
-        plt.title(custom_title, font=style_parameters['font'], 
-                  fontsize=style_parameters['title_font_size'], 
-                  weight='bold', 
-                  loc='left', 
-                  wrap=True, 
-                  pad=titlepad)
-        
         today = date.today()
         plt.figtext(
         0.1, 0.025,
@@ -60,6 +65,8 @@ class Wikimap():
         
     def plot_wcolorbar(self, col="pop_est", custom_cmap="plasma_r", plot_alpha=0.6, setlimits=False, custom_vmin=-25, custom_vmax=50):
         """Creates a map chart with a color scale legend."""
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.axes_grid1 import make_axes_locatable
         # Set min and max for colorbar.
         if setlimits == True:
             self.vmin = custom_vmin
@@ -88,17 +95,67 @@ class Wikimap():
                      edgecolor='black', 
                      alpha=plot_alpha)
 
+    def plot_base(self, custom_cmap="plasma_r", plot_alpha=0.6):
+        """Draws the layers shared by a series of colored maps: country polygons and the color bar axes.
+
+        Countries are then colored with color_countries, so several maps can be saved from one
+        figure without re-plotting every polygon.
+        """
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.axes_grid1 import make_axes_locatable
+        self.cmap = plt.get_cmap(custom_cmap)
+        self.plot_alpha = plot_alpha
+
+        # create an axes on the right side of ax for the color bar drawn by color_countries
+        divider = make_axes_locatable(self.ax)
+        self.cax = divider.append_axes("right", size="3%", pad=0.05)
+
+        self.df.plot(linewidth=0.1, ax=self.ax, edgecolor='black', alpha=plot_alpha)
+        self.countries = self.ax.collections[-1]
+        self.country_rows = polygon_rows(self.df.geometry)
+        if len(self.country_rows) != len(self.countries.get_paths()):
+            raise ValueError("Could not match the plotted polygons to the rows of the dataset")
+
+    def color_countries(self, col, setlimits=False, custom_vmin=-25, custom_vmax=50):
+        """Colors the countries drawn by plot_base by a column and updates the color bar to match."""
+        import matplotlib.pyplot as plt
+        from matplotlib.colors import to_rgba
+        if setlimits == True:
+            self.vmin = custom_vmin
+            self.vmax = custom_vmax
+        else:
+            self.vmin = self.df[col].min()
+            self.vmax = self.df[col].max()
+        norm = plt.Normalize(vmin=self.vmin, vmax=self.vmax)
+
+        values = self.df[col].to_numpy(dtype=float, na_value=np.nan)[self.country_rows]
+        missing = np.isnan(values)
+        facecolors = self.cmap(norm(values))
+        facecolors[:, 3] = self.plot_alpha
+        edgecolors = np.tile(to_rgba('black', self.plot_alpha), (len(values), 1))
+        # Like GeoDataFrame.plot, leave out countries without a value
+        facecolors[missing] = 0
+        edgecolors[missing] = 0
+        self.countries.set_alpha(None)
+        self.countries.set_facecolor(facecolors)
+        self.countries.set_edgecolor(edgecolors)
+
+        # Redraw the color bar (cheap next to the countries) for the new color range
+        sm = plt.cm.ScalarMappable(cmap=self.cmap, norm=norm)
+        sm.set_array([])
+        self.cax.clear()
+        self.cbar = self.fig.colorbar(sm, cax=self.cax, alpha=self.plot_alpha)
+
     def plot_regions(self, region_table, label_col, fontsize=12):
         """Plots region outlines and applies labels based on a given column."""
-        for region in wmf_regions:
-            region_geo = region_table.loc[region, 'geometry']
-            # Get just the boundary linestring (otherwise geoseries.plot has facecolor bug)
-            region_boundary = region_geo.boundary
-            region_boundary.plot(ax=self.ax, lw=1.5, color='black', alpha=1)
-            
+        import geopandas as gpd
+        # Boundary linestrings rather than polygons (otherwise geoseries.plot has facecolor bug)
+        region_boundaries = gpd.GeoSeries(region_table.loc[wmf_regions, 'boundary'].tolist())
+        region_boundaries.plot(ax=self.ax, lw=1.5, color='black', alpha=1)
+
         for region in wmf_regions:
             centroid = region_table.loc[region, 'centroid']
-            self.ax.annotate(text=region_table.loc[region, label_col], 
+            self.region_labels[region] = self.ax.annotate(text=region_table.loc[region, label_col], 
                              xy=(centroid.x, centroid.y), 
                              xycoords='data', ha='center', 
                              va='center', fontsize=fontsize, 
@@ -107,31 +164,77 @@ class Wikimap():
                              zorder=15, 
                              bbox=dict(facecolor=(1, 1, 1, 0.85), edgecolor='black', pad=3))
 
+    def set_region_labels(self, region_table, label_col):
+        """Replaces the text of the region labels drawn by plot_regions."""
+        for region, label in self.region_labels.items():
+            label.set_text(region_table.loc[region, label_col])
+
+    def set_title(self, title, month=False, display_month=True, titlepad=0):
+        """Sets the map title, followed by the month name if display_month is True."""
+        if display_month and month is not None:
+            # Extract month as integer
+            month_int = month.month if isinstance(month, pd.Timestamp) else month
+            month_name = f"({calendar.month_name[month_int]})"
+        else:
+            month_name = ""
+
+        custom_title = f'{title} {month_name}'
+        self.ax.set_title(custom_title, font=style_parameters['font'], 
+                          fontsize=style_parameters['title_font_size'], 
+                          weight='bold', 
+                          loc='left', 
+                          wrap=True, 
+                          pad=titlepad)
+
     def format_map(self, radjust=0.9, ladjust=0.1, tadjust=0.9, badjust=0.1, format_colobar=True, cbar_perc=False):
         """Applies formatting to the map, adjusting margins and color bar settings."""
         for pos in ['right', 'top', 'bottom', 'left']:
-            plt.gca().spines[pos].set_visible(False)
+            self.fig.gca().spines[pos].set_visible(False)
         self.ax.axis('off')
         
-        plt.tight_layout(pad=3)
+        self.fig.tight_layout(pad=3)
         
         if format_colobar == True:
             self.cbar.outline.set_visible(False)
             current_ylabels = self.cax.get_yticklabels()
-            y_ticks = list(self.cax.get_yticks())
-            new_ylabels = []
-            for y_label in current_ylabels:
-                y_value = float(y_label.get_position()[1])
-                new_label = simple_num_format(y_value, perc=cbar_perc)
-                new_ylabels.append(new_label)
+            y_values = [y_label.get_position()[1] for y_label in current_ylabels]
+            new_ylabels = simple_num_format_array(y_values, perc=cbar_perc)
             self.cax.set_yticklabels(new_ylabels, fontsize=10, font=style_parameters['font'])
 
-    def finalize_plot(self, save_file_name, display=True):
-        """Finalizes the map visualization by saving to file and optionally displaying it."""
-        save_path = save_directory + save_file_name
-        plt.savefig(save_path, dpi=300)
+    def finalize_plot(self, save_file_name, display=True, cache_key=None, close=True):
+        """Finalizes the map visualization by saving to file and optionally displaying it.
+
+        The figure is closed afterwards unless close is False.
+        """
+        save_path = output_path(save_file_name)
+        self.fig.savefig(save_path, dpi=300)
+        record_output(save_path)
+        if cache_key is not None:
+            render_cache.record(save_file_name, cache_key)
         
         if display:
+            import matplotlib.pyplot as plt
             plt.show()
+        if close:
+            self.close()
+
+    def close(self):
+        """Releases the map's figure so its memory can be reclaimed."""
+        if self.fig is None:
+            return
+        import matplotlib.pyplot as plt
+        plt.close(self.fig)
+        self.fig = None
+        self.ax = None
+        self.cax = None
+        self.cbar = None
+        self.countries = None
+        self.region_labels = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
             
             
\ No newline at end of file
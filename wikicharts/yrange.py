@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .data_utils import closestdivisible, as_float_columns
+
+# Tick steps of matplotlib's default (AutoLocator) y-axis ticks
+TICK_STEPS = [1, 2, 2.5, 5, 10]
+
+
+@dataclass(frozen=True)
+class YRange:
+    """A y-axis as matplotlib would autoscale it for some data: the view limits and the ticks it would place."""
+    ymin: float
+    ymax: float
+    ticks: np.ndarray
+
+    @property
+    def tick_range(self):
+        """The distance between the first and last ticks, which can extend a little past the view limits."""
+        return self.ticks[-1] - self.ticks[0]
+
+    @property
+    def num_ticks(self):
+        return len(self.ticks)
+
+
+def tick_bins(height, nrows=1):
+    """Returns the number of tick intervals matplotlib's default locator uses on each row of subplots of a figure height inches tall.
+
+    This is what AutoLocator works out from the drawn axes, using the default subplot
+    layout and tick label size.
+    """
+    import matplotlib as mpl
+    from matplotlib.font_manager import FontProperties
+    top = mpl.rcParams['figure.subplot.top']
+    bottom = mpl.rcParams['figure.subplot.bottom']
+    hspace = mpl.rcParams['figure.subplot.hspace']
+    axes_height = height * (top - bottom) / (nrows + hspace * (nrows - 1))
+    label_size = FontProperties(size=mpl.rcParams['ytick.labelsize']).get_size_in_points()
+    # Each tick is given twice the height of its label
+    return int(np.clip(np.floor(axes_height * 72 / (label_size * 2)), 1, 9))
+
+
+def plan_yrange(*series, nbins):
+    """Returns the YRange matplotlib would give an axes with series (arrays of y values) plotted as lines on it, without plotting them.
+
+    nbins is the number of tick intervals (see tick_bins). Missing values are ignored,
+    as they are when plotting.
+    """
+    import matplotlib as mpl
+    from matplotlib.ticker import MaxNLocator
+    from matplotlib.transforms import nonsingular
+    values = np.concatenate([np.asarray(s, dtype=float).ravel() for s in series])
+    ymin, ymax = nonsingular(np.nanmin(values), np.nanmax(values), expander=0.05)
+    margin = (ymax - ymin) * mpl.rcParams['axes.ymargin']
+    ymin, ymax = ymin - margin, ymax + margin
+    ticks = MaxNLocator(nbins=nbins, steps=TICK_STEPS).tick_values(ymin, ymax)
+    return YRange(ymin, ymax, ticks)
+
+
+def trendline(x, y):
+    """Returns the values of the linear least-squares fit of y on x, at x."""
+    return np.poly1d(np.polyfit(x, y, 1))(x)
+
+
+def plan_subplot_yranges(df, x, columns, nbins, trendlines=True):
+    """Returns the YRange of each column of df as a small-multiples subplot, with its trendline if trendlines is True (see Wikichart.plot_multi_trendlines)."""
+    df = as_float_columns(df)
+    x_num = None
+    if trendlines:
+        import matplotlib.dates as mdates
+        x_num = mdates.date2num(df[x])
+    yranges = []
+    for column in columns:
+        series = [df[column]]
+        if trendlines:
+            series.append(trendline(x_num, df[column]))
+        yranges.append(plan_yrange(*series, nbins=nbins))
+    return yranges
+
+
+def widest_tick_range(yranges):
+    """Returns the largest tick range of several YRanges and its number of ticks, so that charts can share a y-scale."""
+    widest = max(yranges, key=lambda yrange: yrange.tick_range)
+    return widest.tick_range, widest.num_ticks
+
+
+def standardized_limits(ymin, ymax, yrange, num_ticks, std_cutoff=15):
+    """Returns y-axis limits spanning yrange (split into num_ticks - 1 intervals), centered on the middle of ymin and ymax and snapped to a tick.
+
+    Returns None if the current range is less than 1/std_cutoff of yrange, since
+    stretching it that far would flatten the line.
+    """
+    std_yinterval = yrange / (num_ticks - 1)
+    current_yrange = ymax - ymin
+    if current_yrange <= (yrange / std_cutoff):
+        return None
+    current_ymedian = ymin + ((ymax - ymin) / 2)
+    new_ymedian = closestdivisible(current_ymedian, std_yinterval)
+    if (num_ticks % 2) == 0:
+        if new_ymedian < current_ymedian:
+            new_ymin = new_ymedian - (std_yinterval * (num_ticks / 2 - 1))
+        else:
+            new_ymin = new_ymedian - (std_yinterval * (num_ticks / 2))
+    else:
+        new_ymin = new_ymedian - (yrange / 2)
+    new_ymin = max(0, new_ymin)
+    return new_ymin, new_ymin + yrange